@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from helper_functions import *
+from loader_functions import *
+from normalize_functions import *
+from pipeline import *
+
+# Normalization entry points selectable from a batch spec
+NORMALIZE_FUNCTIONS = {
+    "1NF": normalize_1NF,
+    "2NF": normalize_2NF,
+    "3NF": normalize_3NF,
+    "BCNF": normalize_BCNF,
+    "4NF": normalize_4NF,
+    "5NF": normalize_5NF,
+}
+
+
+# --------------------------------- Spec Functions ---------------------------------
+
+
+# Reads a batch spec from a JSON or YAML file (YAML needs PyYAML)
+def read_spec(path):
+    with open(path, encoding="utf-8") as file:
+        if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("Reading YAML specs requires PyYAML to be installed.")
+            return yaml.safe_load(file)
+        return json.load(file)
+
+
+# Builds a relation from one entry of a batch spec: name, attributes, keys, FDs and data;
+# `data` is either a list of tuples (dicts or value lists) or a path to a data file
+def build_relation(entry, base_directory="."):
+    relation = create_relation(
+        name=entry["name"],
+        attributes=list(entry.get("attributes", [])),
+        primary_key=entry.get("primary_key"),
+        candidate_keys=entry.get("candidate_keys"),
+        foreign_keys=entry.get("foreign_keys"),
+    )
+
+    data = entry.get("data")
+    if isinstance(data, str):
+        relation.use_columnar_storage()
+        if not relation.attributes:
+            loaded = load_relation_data(os.path.join(base_directory, data))
+            relation.attributes = loaded.attributes
+            relation.copy_data(loaded)
+        else:
+            load_relation_data(os.path.join(base_directory, data), relation)
+    elif data:
+        for row in data:
+            if isinstance(row, dict):
+                relation.add_tuple(row)
+            else:
+                relation.add_tuple(dict(zip(relation.attributes, row)))
+
+    # FDs are added once the data is loaded, since a data file's header may be what supplies
+    # the attributes they refer to; the loaded tuples are then checked in one scan
+    for fd in entry.get("functional_dependencies", []):
+        X, Y = (fd["X"], fd["Y"]) if isinstance(fd, dict) else fd
+        relation.add_functional_dependency(X, Y)
+
+    if entry.get("fd_checks"):
+        relation.check_functional_dependencies(entry["fd_checks"])
+        relation.functional_dependency_indexes()
+        violations = relation.fd_violations
+        if violations and entry["fd_checks"] == "reject":
+            more = f" ({len(violations)} violations)" if len(violations) > 1 else ""
+            raise ValueError(violations[0]["message"] + more)
+
+    if entry.get("discover_dependencies"):
+        discover_functional_dependencies(relation, entry.get("max_lhs"), apply=True)
+
+    return relation
+
+
+# Creates a rule-based decision provider from a spec entry: attributes listed under
+# "non_atomic" are reported as non-atomic, and duplicate key values get a numbered suffix
+def spec_decision_provider(entry):
+    return RuleProvider(
+        [
+            {
+                "kind": "atomic",
+                "attribute": flatten_attributes(entry.get("non_atomic", [])),
+                "answer": "no",
+            },
+            {"kind": "atomic", "answer": "yes"},
+            {"kind": "duplicate_key", "answer": "{value}_{count}"},
+        ]
+    )
+
+
+# --------------------------------- Batch Functions ---------------------------------
+
+
+# Lists, as {"X": [...], "Y": [...]} dicts, the FDs of the original relation that the
+# normalized relations no longer preserve
+def lost_dependency_dicts(original, relations):
+    return [
+        {"X": flatten_attributes(fd.get_x()), "Y": flatten_attributes(fd.get_y())}
+        for fd in find_lost_dependencies(original, relations)
+    ]
+
+
+# Normalizes one spec entry to its stage and returns a JSON-serializable result; an entry
+# listing several "stages" runs them through one pipeline, computing shared stages once
+def run_entry(entry, default_stage="3NF", base_directory="."):
+    stage = str(entry.get("stage", default_stage)).upper()
+    stages = [str(name).upper() for name in entry.get("stages", [])]
+    result = {"name": entry.get("name")}
+    result.update({"stages": stages} if stages else {"stage": stage})
+
+    # The caller's settings are restored afterwards, whatever the entry sets
+    previous_provider = get_decision_provider()
+    previous_decomposition_checks = get_decomposition_checks()
+    previous_atomicity_checks = get_atomicity_checks()
+    try:
+        for name in stages or [stage]:
+            if name not in NORMALIZE_FUNCTIONS:
+                raise ValueError(f"Unknown normalization stage: '{name}'.")
+        relation = build_relation(entry, base_directory)
+        original = relation.copy(with_data=False)
+        if relation.fd_violations:
+            result["fd_violations"] = [v["message"] for v in relation.fd_violations]
+        relation.check_functional_dependencies(None)
+
+        set_decision_provider(spec_decision_provider(entry))
+        set_decomposition_checks(entry.get("decomposition_checks", "warn"))
+        set_atomicity_checks(entry.get("atomicity_checks", "auto"))
+        # The quiet sink discards messages, so decomposition problems are recorded instead
+        with use_output_sink(QuietSink()), record_decomposition_problems() as problems:
+            if stages:
+                outputs = NormalizationPipeline(relation).run_all(stages)
+            elif stage == "3NF" and entry.get("synthesis"):
+                relations = normalize_3NF(relation, synthesis=True)
+            else:
+                relations = NORMALIZE_FUNCTIONS[stage](relation)
+
+        if stages:
+            result["relations"] = {
+                name: [rel.to_dict() for rel in outputs[name]] for name in stages
+            }
+            result["lost_dependencies"] = {
+                name: lost_dependency_dicts(original, outputs[name]) for name in stages
+            }
+        else:
+            result["relations"] = [rel.to_dict() for rel in relations]
+            result["lost_dependencies"] = lost_dependency_dicts(original, relations)
+        if problems:
+            result["decomposition_problems"] = problems
+    except Exception as error:
+        result["error"] = f"{type(error).__name__}: {error}"
+    finally:
+        set_decision_provider(previous_provider)
+        set_decomposition_checks(previous_decomposition_checks)
+        set_atomicity_checks(previous_atomicity_checks)
+
+    return result
+
+
+# Normalizes every relation described by a spec and returns the list of results; with
+# more than one worker, relations are normalized on a process pool (results keep spec order)
+def run_batch(spec, stage=None, base_directory=".", workers=1):
+    default_stage = stage or spec.get("stage", "3NF")
+    entries = spec.get("relations", [])
+
+    if workers == 1 or len(entries) < 2:
+        return [run_entry(entry, default_stage, base_directory) for entry in entries]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(
+            executor.map(
+                run_entry,
+                entries,
+                repeat(default_stage),
+                repeat(base_directory),
+            )
+        )
+
+
+# Command-line entry point: python3 batch.py spec.json [--stage 3NF] [--output results.json]
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Normalize many relations described in a JSON/YAML spec file."
+    )
+    parser.add_argument("spec", help="JSON or YAML file describing the relations")
+    parser.add_argument(
+        "--stage",
+        choices=list(NORMALIZE_FUNCTIONS),
+        help="normal form to reach (overrides the spec's default stage)",
+    )
+    parser.add_argument("--output", help="file to write results to (default: stdout)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of processes normalizing relations in parallel (0 = one per CPU)",
+    )
+    options = parser.parse_args(arguments)
+
+    spec = read_spec(options.spec)
+    results = run_batch(
+        spec,
+        options.stage,
+        os.path.dirname(os.path.abspath(options.spec)),
+        options.workers or None,
+    )
+
+    output = json.dumps({"results": results}, indent=2)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    return 1 if any("error" in result for result in results) else 0
+
+
+# Entry point for script execution
+if __name__ == "__main__":
+    sys.exit(main())
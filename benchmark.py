@@ -0,0 +1,281 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import zlib
+
+from batch import spec_decision_provider
+from normalize_functions import *
+
+# --------------------------------- Workload Functions ---------------------------------
+
+
+# Generates a random relation for benchmarking. The first `key_size` attributes form the
+# primary key and get unique value combinations; `fds` FDs are drawn with determinants of at
+# most `max_lhs` earlier attributes, each non-key attribute being the dependent of at most
+# one FD, so the generated tuples satisfy every FD. The other attributes hold random values
+# with `cardinality` distinct values each
+def generate_relation(
+    name="bench",
+    attributes=8,
+    fds=4,
+    max_lhs=2,
+    key_size=1,
+    rows=1000,
+    cardinality=10,
+    seed=None,
+    columnar=False,
+):
+    generator = random.Random(seed)
+    names = [f"a{i}" for i in range(attributes)]
+    key_size = max(1, min(key_size, attributes))
+
+    relation = Relation(name, names[:], columnar=columnar)
+    relation.add_primary_key(names[:key_size])
+
+    # Dependents are distinct non-key attributes, determined only by attributes before them
+    dependents = generator.sample(
+        range(key_size, attributes), min(fds, attributes - key_size)
+    )
+    determinants = {}
+    for position in sorted(dependents):
+        lhs_size = generator.randint(1, max(1, min(max_lhs, position)))
+        determinants[position] = sorted(generator.sample(range(position), lhs_size))
+        relation.add_functional_dependency(
+            [names[i] for i in determinants[position]], [names[position]]
+        )
+
+    # Key values enumerate the rows in a mixed radix, so key combinations never repeat
+    radix = max(2, round(rows ** (1 / key_size)) + 1)
+    salt = generator.randrange(1 << 30)
+    data = []
+    for row_number in range(rows):
+        values = []
+        for position in range(attributes):
+            if position < key_size:
+                values.append(
+                    str(row_number // radix ** (key_size - 1 - position) % radix)
+                )
+            elif position in determinants:
+                # crc32 of the repr, unlike hash(), does not change with PYTHONHASHSEED
+                lhs = tuple(values[i] for i in determinants[position])
+                digest = zlib.crc32(repr((salt, position, lhs)).encode("utf-8"))
+                values.append(str(digest % cardinality))
+            else:
+                values.append(str(generator.randrange(cardinality)))
+        data.append(values)
+    relation.add_tuples(data, attributes=names)
+    return relation
+
+
+# --------------------------------- Timing Functions ---------------------------------
+
+
+# Runs `function` on a fresh input from `make_input` `repeat` times and returns timing stats
+def time_function(function, make_input, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        arguments = make_input()
+        start = time.perf_counter()
+        function(*arguments)
+        timings.append(time.perf_counter() - start)
+    return {
+        "min": min(timings),
+        "mean": sum(timings) / len(timings),
+        "runs": len(timings),
+    }
+
+
+# Times every detect_*, fix_* and normalize_* function on one relation. Fix functions are
+# fed the anomalies their detector reports, and are skipped when there are none
+def benchmark_relation(relation, repeat=3):
+    results = {}
+
+    def fresh():
+        return (relation.copy(),)
+
+    detectors = {
+        "detect_1NF_anomalies": detect_1NF_anomalies,
+        "detect_2NF_anomalies": detect_2NF_anomalies,
+        "detect_3NF_anomalies": detect_3NF_anomalies,
+        "detect_BCNF_anomalies": detect_BCNF_anomalies,
+        "detect_4NF_anomalies": detect_4NF_anomalies,
+        "detect_5NF_anomalies": detect_5NF_anomalies,
+    }
+    for name, detector in detectors.items():
+        results[name] = time_function(detector, fresh, repeat)
+
+    fixes = {
+        "fix_non_atomic_attributes": (fix_non_atomic_attributes, detect_1NF_anomalies),
+        "fix_partial_functional_dependencies": (
+            fix_partial_functional_dependencies,
+            detect_2NF_anomalies,
+        ),
+        "fix_transitive_functional_dependencies": (
+            fix_transitive_functional_dependencies,
+            detect_3NF_anomalies,
+        ),
+        "fix_mvds": (fix_mvds, detect_4NF_anomalies),
+        "ensure_join_dependencies": (ensure_join_dependencies, detect_5NF_anomalies),
+    }
+    for name, (fix, detector) in fixes.items():
+        anomalies = detector(relation.copy())
+        if anomalies:
+            results[name] = time_function(
+                fix, lambda: (relation.copy(), anomalies), repeat
+            )
+    if detect_BCNF_anomalies(relation):
+        results["fix_BCNF_violations"] = time_function(
+            fix_BCNF_violations, fresh, repeat
+        )
+    results["synthesize_3NF_relations"] = time_function(
+        synthesize_3NF_relations, fresh, repeat
+    )
+
+    normalizers = {
+        "normalize_1NF": normalize_1NF,
+        "normalize_2NF": normalize_2NF,
+        "normalize_3NF": normalize_3NF,
+        "normalize_BCNF": normalize_BCNF,
+        "normalize_4NF": normalize_4NF,
+        "normalize_5NF": normalize_5NF,
+    }
+    for name, normalizer in normalizers.items():
+        results[name] = time_function(normalizer, fresh, repeat)
+
+    return results
+
+
+# Generates `schemas` relations from the workload settings and benchmarks each of them;
+# prompts are answered automatically and normalization output is discarded
+def run_benchmarks(settings, schemas=3, repeat=3, seed=0):
+    runs = []
+    with use_decision_provider(spec_decision_provider({})):
+        with use_output_sink(QuietSink()):
+            for index in range(schemas):
+                relation = generate_relation(
+                    name=f"bench{index}", seed=seed + index, **settings
+                )
+                runs.append(
+                    {
+                        "schema": relation.name,
+                        "seed": seed + index,
+                        "functional_dependencies": len(
+                            relation.functional_dependencies
+                        ),
+                        "timings": benchmark_relation(relation, repeat),
+                    }
+                )
+
+    return {
+        "settings": dict(settings, schemas=schemas, repeat=repeat, seed=seed),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": runs,
+    }
+
+
+# --------------------------------- Comparison Functions ---------------------------------
+
+
+# Compares two benchmark results schema by schema and returns the functions whose fastest
+# run got slower by more than `threshold` (a fraction, 0.2 = 20%)
+def compare_results(baseline, current, threshold=0.2):
+    baseline_runs = {run["schema"]: run["timings"] for run in baseline.get("runs", [])}
+    regressions = []
+    for run in current.get("runs", []):
+        previous = baseline_runs.get(run["schema"], {})
+        for function, timing in run["timings"].items():
+            if function not in previous or previous[function]["min"] <= 0:
+                continue
+            ratio = timing["min"] / previous[function]["min"]
+            if ratio > 1 + threshold:
+                regressions.append(
+                    {
+                        "schema": run["schema"],
+                        "function": function,
+                        "baseline": previous[function]["min"],
+                        "current": timing["min"],
+                        "ratio": ratio,
+                    }
+                )
+    return regressions
+
+
+# Command-line entry point: python3 benchmark.py [--rows 1000] [--output results.json]
+# [--compare baseline.json]
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Time every detect/fix/normalize function on generated relations."
+    )
+    parser.add_argument(
+        "--attributes", type=int, default=8, help="attributes per relation"
+    )
+    parser.add_argument("--fds", type=int, default=4, help="FDs per relation")
+    parser.add_argument("--max-lhs", type=int, default=2, help="largest FD determinant")
+    parser.add_argument(
+        "--key-size", type=int, default=1, help="primary key attributes"
+    )
+    parser.add_argument("--rows", type=int, default=1000, help="tuples per relation")
+    parser.add_argument(
+        "--cardinality",
+        type=int,
+        default=10,
+        help="distinct values per non-key attribute",
+    )
+    parser.add_argument("--columnar", action="store_true", help="use columnar storage")
+    parser.add_argument("--schemas", type=int, default=3, help="relations to generate")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per function")
+    parser.add_argument(
+        "--seed", type=int, default=0, help="seed of the first relation"
+    )
+    parser.add_argument("--output", help="file to write results to (default: stdout)")
+    parser.add_argument(
+        "--compare", help="earlier results file to check for regressions"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="slowdown reported as a regression (0.2 = 20%%)",
+    )
+    options = parser.parse_args(arguments)
+
+    settings = {
+        "attributes": options.attributes,
+        "fds": options.fds,
+        "max_lhs": options.max_lhs,
+        "key_size": options.key_size,
+        "rows": options.rows,
+        "cardinality": options.cardinality,
+        "columnar": options.columnar,
+    }
+    results = run_benchmarks(settings, options.schemas, options.repeat, options.seed)
+
+    output = json.dumps(results, indent=2)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    if options.compare:
+        with open(options.compare, encoding="utf-8") as file:
+            regressions = compare_results(json.load(file), results, options.threshold)
+        for regression in regressions:
+            print(
+                f"Regression in {regression['function']} on {regression['schema']}: "
+                f"{regression['baseline']:.6f}s -> {regression['current']:.6f}s "
+                f"({regression['ratio']:.2f}x)",
+                file=sys.stderr,
+            )
+        return 1 if regressions else 0
+
+    return 0
+
+
+# Entry point for script execution
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,380 @@
-# Class representing a Functional Dependency (FD) in a relation
+import time
+from array import array
+from types import MappingProxyType
+
+from instrumentation import *
+from output_sinks import *
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional; columnar codes stay in plain arrays without it
+    numpy = None
+
+
+# Flattens (possibly nested) attribute lists into unique, whitespace-stripped attribute names
+def flatten_attributes(attributes):
+    if attributes is None:
+        return []
+    if not isinstance(attributes, (list, tuple, set, frozenset)):
+        attributes = [attributes]
+
+    flattened = []
+    seen = set()
+    for attr in attributes:
+        names = (
+            flatten_attributes(attr)
+            if isinstance(attr, (list, tuple, set, frozenset))
+            else [str(attr).strip()]
+        )
+        for name in names:
+            if name and name not in seen:
+                flattened.append(name)
+                seen.add(name)
+    return flattened
+
+
+# Yields the bit positions set in an attribute bitmask, lowest first
+def iterate_bits(mask):
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+# Builds an order-insensitive key identifying the FD X -> Y
+def dependency_key(X, Y):
+    return frozenset(flatten_attributes(X)), frozenset(flatten_attributes(Y))
+
+
+# Class computing attribute closures (X+) over a set of FDs stored as bitmasks
+class AttributeClosure:
+    def __init__(self, attributes=None, dependencies=None):
+        # Interns attribute names to bit positions; the relation's attributes come first
+        self.positions = {}  # Maps attribute name -> bit position
+        self.names = []  # Maps bit position -> attribute name
+        self.lhs_masks = []  # Left-hand side bitmask of each FD
+        self.rhs_masks = []  # Right-hand side bitmask of each FD
+        self.lhs_sizes = []  # Number of attributes in each left-hand side
+        self.fds_by_attribute = (
+            []
+        )  # Maps bit position -> FDs whose left-hand side uses it
+        self.empty_lhs_fds = []  # FDs with an empty left-hand side (always fire)
+        self.closures = {}  # Memoized closures keyed by attribute bitmask
+        self.universe = self.encode(attributes or [])
+
+        for X, Y in dependencies or []:
+            self.add_dependency(X, Y)
+
+    def bit(self, name):
+        # Returns the bit position of an attribute, interning it on first use
+        position = self.positions.get(name)
+        if position is None:
+            position = len(self.names)
+            self.positions[name] = position
+            self.names.append(name)
+            self.fds_by_attribute.append([])
+        return position
+
+    def encode(self, attributes):
+        # Converts attribute names (nested lists allowed) into a bitmask
+        mask = 0
+        for name in flatten_attributes(attributes):
+            mask |= 1 << self.bit(name)
+        return mask
+
+    def decode(self, mask):
+        # Converts a bitmask back into attribute names, in interning order
+        return [self.names[position] for position in iterate_bits(mask)]
+
+    def add_dependency(self, X, Y):
+        # Stores an FD as a pair of bitmasks and indexes it by its left-hand side
+        self.add_dependency_masks(self.encode(X), self.encode(Y))
+
+    def add_dependency_masks(self, lhs_mask, rhs_mask):
+        # Stores an FD given directly as bitmasks; returns its index
+        index = len(self.lhs_masks)
+        self.lhs_masks.append(lhs_mask)
+        self.rhs_masks.append(rhs_mask)
+        self.lhs_sizes.append(bin(lhs_mask).count("1"))
+        if lhs_mask:
+            for position in iterate_bits(lhs_mask):
+                self.fds_by_attribute[position].append(index)
+        else:
+            self.empty_lhs_fds.append(index)
+        self.closures.clear()
+        return index
+
+    def closure(self, mask, use_cache=True):
+        # Computes X+ in time linear in the size of the FD set (Beeri-Bernstein):
+        # each FD keeps a counter of left-hand attributes not yet in the closure,
+        # and fires once that counter reaches zero
+        if use_cache:
+            cached = self.closures.get(mask)
+            if cached is not None:
+                return cached
+
+        result = mask
+        counters = self.lhs_sizes[:]
+        pending = list(iterate_bits(mask))
+
+        for index in self.empty_lhs_fds:
+            new_bits = self.rhs_masks[index] & ~result
+            result |= new_bits
+            pending.extend(iterate_bits(new_bits))
+
+        while pending:
+            position = pending.pop()
+            for index in self.fds_by_attribute[position]:
+                counters[index] -= 1
+                if counters[index] == 0:
+                    new_bits = self.rhs_masks[index] & ~result
+                    if new_bits:
+                        result |= new_bits
+                        pending.extend(iterate_bits(new_bits))
+
+        if use_cache:
+            self.closures[mask] = result
+        return result
+
+    def attribute_closure(self, attributes):
+        # Returns the closure of a list of attribute names as a list of names
+        return self.decode(self.closure(self.encode(attributes)))
+
+    def implies(self, lhs_mask, rhs_mask):
+        # Checks whether the FD set implies lhs -> rhs
+        return rhs_mask & ~self.closure(lhs_mask) == 0
+
+    def is_superkey(self, mask):
+        # Checks whether an attribute set determines every attribute of the relation
+        return self.universe & ~self.closure(mask) == 0
+
+    def minimal_cover(self):
+        # Computes a minimal cover as (left-hand side, single-attribute right-hand side) masks:
+        # right-hand sides are split, extraneous left-hand attributes removed and redundant FDs dropped
+        split = []
+        seen = set()
+        for lhs_mask, rhs_mask in zip(self.lhs_masks, self.rhs_masks):
+            for position in iterate_bits(rhs_mask & ~lhs_mask):
+                dependency = (lhs_mask, 1 << position)
+                if dependency not in seen:
+                    seen.add(dependency)
+                    split.append(dependency)
+
+        # Left-reduce against the original FDs; removing extraneous attributes keeps F+ unchanged
+        reduced = []
+        seen = set()
+        for lhs_mask, rhs_bit in split:
+            for position in iterate_bits(lhs_mask):
+                smaller = lhs_mask & ~(1 << position)
+                if self.closure(smaller) & rhs_bit:
+                    lhs_mask = smaller
+            if (lhs_mask, rhs_bit) not in seen:
+                seen.add((lhs_mask, rhs_bit))
+                reduced.append((lhs_mask, rhs_bit))
+
+        cover = AttributeClosure()
+        cover.positions = dict(self.positions)
+        cover.names = list(self.names)
+        cover.fds_by_attribute = [[] for _ in self.names]
+        fds_by_rhs = (
+            {}
+        )  # Maps right-hand attribute mask -> number of FDs still deriving it
+        for lhs_mask, rhs_bit in reduced:
+            cover.add_dependency_masks(lhs_mask, rhs_bit)
+            fds_by_rhs[rhs_bit] = fds_by_rhs.get(rhs_bit, 0) + 1
+
+        # An FD is redundant if its right-hand side still follows from the others;
+        # an FD that is the only one deriving its attribute never is
+        for index, (lhs_mask, rhs_bit) in enumerate(reduced):
+            if fds_by_rhs[rhs_bit] == 1:
+                continue
+            cover.rhs_masks[index] = 0
+            if cover.closure(lhs_mask, use_cache=False) & rhs_bit:
+                fds_by_rhs[rhs_bit] -= 1
+            else:
+                cover.rhs_masks[index] = rhs_bit
+
+        return [
+            (lhs_mask, rhs_mask)
+            for lhs_mask, rhs_mask in zip(cover.lhs_masks, cover.rhs_masks)
+            if rhs_mask
+        ]
+
+    def minimize_key(self, mask, required=0):
+        # Shrinks a superkey to a candidate key by dropping attributes it does not need
+        for position in iterate_bits(mask & ~required):
+            reduced = mask & ~(1 << position)
+            if self.is_superkey(reduced):
+                mask = reduced
+        return mask
+
+    def candidate_keys(self, limit=None, time_budget=None):
+        # Enumerates candidate keys with the Lucchesi-Osborn algorithm: every new key is a
+        # minimized X | (K - Y) for a known key K and FD X -> Y, so the cost grows with the
+        # number of keys found rather than with the power set of the attributes
+        if not self.universe:
+            return []
+
+        deadline = None if time_budget is None else time.monotonic() + time_budget
+        lhs_union = 0
+        rhs_union = 0
+        for lhs_mask, rhs_mask in zip(self.lhs_masks, self.rhs_masks):
+            lhs_union |= lhs_mask
+            rhs_union |= rhs_mask & ~lhs_mask
+
+        # Attributes never on a right-hand side are in every key; ones only on right-hand sides in none
+        required = self.universe & ~rhs_union
+        excluded = self.universe & rhs_union & ~lhs_union
+
+        keys = [self.minimize_key(self.universe & ~excluded, required)]
+        index = 0
+        while index < len(keys):
+            key = keys[index]
+            for lhs_mask, rhs_mask in zip(self.lhs_masks, self.rhs_masks):
+                if limit is not None and len(keys) >= limit:
+                    return keys
+                if deadline is not None and time.monotonic() > deadline:
+                    return keys
+
+                candidate = (lhs_mask | (key & ~rhs_mask)) & self.universe & ~excluded
+                if any(known & ~candidate == 0 for known in keys):
+                    continue
+                if self.is_superkey(candidate):
+                    keys.append(self.minimize_key(candidate, required))
+            index += 1
+        return keys
+
+    def minimize_schema_key(self, schema):
+        # Shrinks a schema (attribute bitmask) to a candidate key of that schema
+        key = schema
+        for position in iterate_bits(schema):
+            reduced = key & ~(1 << position)
+            if self.closure(reduced) & schema == schema:
+                key = reduced
+        return key
+
+    def project_dependencies(self, schema):
+        # Projects the FDs onto a schema: every left-hand side inside it determines the
+        # schema attributes in its closure. Returns (left-hand side, right-hand side) masks
+        projected = {}
+        for lhs_mask in self.lhs_masks:
+            if lhs_mask & ~schema == 0:
+                determined = self.closure(lhs_mask) & schema & ~lhs_mask
+                if determined:
+                    projected[lhs_mask] = projected.get(lhs_mask, 0) | determined
+        return list(projected.items())
+
+    def bcnf_violation(self, schema):
+        # Finds X inside a schema that determines some but not all of the schema's other
+        # attributes, returning (X, X+ ∩ schema), or None. FD left-hand sides are tried first;
+        # then every attribute pair {A, B} is tested: if (schema - AB)+ holds A but not B,
+        # schema - AB violates BCNF and is shrunk while it still determines A. Both tests
+        # only compute closures, never enumerating subsets of the schema
+        for lhs_mask in self.lhs_masks:
+            if lhs_mask & ~schema == 0:
+                determined = self.closure(lhs_mask) & schema
+                if determined & ~lhs_mask and determined != schema:
+                    return lhs_mask, determined
+
+        positions = list(iterate_bits(schema))
+        for index, first in enumerate(positions):
+            for second in positions[index + 1 :]:
+                pair = (1 << first) | (1 << second)
+                rest = schema & ~pair
+                determined = self.closure(rest) & pair
+                if not determined or determined == pair:
+                    continue
+                for position in iterate_bits(rest):
+                    reduced = rest & ~(1 << position)
+                    if self.closure(reduced) & determined:
+                        rest = reduced
+                return rest, self.closure(rest) & schema
+        return None
+
+    def bcnf_decomposition(self, schema=None):
+        # Splits a schema (default: the universe) into BCNF schemas: a violation X with
+        # X+ ∩ schema = Y splits the schema into Y and schema - (Y - X), recursively.
+        # Schemas contained in another one are dropped
+        schemas = []
+        pending = [self.universe if schema is None else schema]
+        while pending:
+            current = pending.pop()
+            violation = self.bcnf_violation(current)
+            if violation is None:
+                schemas.append(current)
+                continue
+            lhs_mask, determined = violation
+            pending.append(current & ~(determined & ~lhs_mask))
+            pending.append(determined)
+
+        return [
+            schema
+            for index, schema in enumerate(schemas)
+            if not any(
+                schema & ~other == 0 and (schema != other or other_index < index)
+                for other_index, other in enumerate(schemas)
+                if other_index != index
+            )
+        ]
+
+
+# Class representing a Functional Dependency (FD) in a relation; sides are stored as
+# tuples, and FDs compare and hash by their attribute sets, so they can be set members.
+# The sets are built when needed rather than kept, as FDs are held by the tens of thousands
 class FunctionalDependency:
+    __slots__ = ("_X", "_Y")
+
     def __init__(self, X, Y):
         # Initialize FD with left-hand side (X) and right-hand side (Y)
-        # Ensures both X and Y are lists, even if given as single values
-        self.X = X if isinstance(X, list) else [X]
-        self.Y = Y if isinstance(Y, list) else [Y]
+        # Ensures both X and Y are sequences, even if given as single values
+        self.X = X
+        self.Y = Y
+
+    @property
+    def X(self):
+        return list(self._X)
+
+    @X.setter
+    def X(self, attributes):
+        self._X = (
+            tuple(attributes)
+            if isinstance(attributes, (list, tuple))
+            else (attributes,)
+        )
+
+    @property
+    def Y(self):
+        return list(self._Y)
+
+    @Y.setter
+    def Y(self, attributes):
+        self._Y = (
+            tuple(attributes)
+            if isinstance(attributes, (list, tuple))
+            else (attributes,)
+        )
+
+    def key(self):
+        # Returns the order-insensitive (X, Y) attribute sets identifying the FD
+        return dependency_key(self._X, self._Y)
+
+    def __eq__(self, other):
+        if not isinstance(other, FunctionalDependency):
+            return NotImplemented
+        return self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
 
     def adjust_to_primary_key(self, primary_key):
         # Adjusts FD's left-hand side (X) to match the primary key format
         primary_key_tuple = tuple(tuple(pk) for pk in primary_key)
         self.X = [list(pk) for pk in primary_key_tuple]
 
+    def to_masks(self, closure):
+        # Returns the FD as a (left-hand side, right-hand side) pair of bitmasks
+        return closure.encode(self._X), closure.encode(self._Y)
+
     def get_x(self):
         # Returns the left-hand side (X) of the FD
         return self.X
@@ -24,9 +388,423 @@ class FunctionalDependency:
         return f"{self.X} -> {self.Y}"
 
 
+# Class holding data buffers shared by several stores; the count of stores holding them
+# lets a writer modify them in place when it is the only holder and copy them otherwise
+class SharedBuffers:
+    def __init__(self, payload):
+        self.payload = payload
+        self.references = 1
+
+    def acquire(self):
+        # Registers one more store sharing the buffers
+        self.references += 1
+        return self
+
+    def release(self):
+        # Unregisters a store that no longer uses the buffers
+        self.references -= 1
+
+    def writable(self, copy):
+        # Returns buffers the caller may modify: these if unshared, else a private copy
+        if self.references <= 1:
+            return self
+        self.references -= 1
+        return SharedBuffers(copy(self.payload))
+
+
+# Class storing relation data row by row, one dictionary per tuple (the default layout);
+# stored dictionaries are never modified, so copies share them until one side writes
+class RowStore:
+    def __init__(self, rows=None):
+        # Keeps the given list of row dictionaries as-is
+        self.shared = SharedBuffers([] if rows is None else rows)
+
+    def __del__(self):
+        self.shared.release()
+
+    @property
+    def rows(self):
+        return self.shared.payload
+
+    def writable_rows(self):
+        # Returns the row list, first detaching it from other stores sharing it
+        self.shared = self.shared.writable(list.copy)
+        return self.shared.payload
+
+    def __len__(self):
+        return len(self.rows)
+
+    def attributes(self):
+        # Returns the attribute names present in the stored rows
+        return list(self.rows[0].keys()) if self.rows else []
+
+    def append(self, row):
+        self.writable_rows().append(dict(row))
+
+    def extend(self, attributes, rows):
+        # Appends positional tuples whose values follow `attributes`
+        self.writable_rows().extend(dict(zip(attributes, row)) for row in rows)
+
+    def row(self, index):
+        return self.rows[index]
+
+    def value(self, index, attribute):
+        return self.rows[index].get(attribute)
+
+    def set_value(self, index, attribute, value):
+        # Replaces the tuple with an updated dictionary; other holders keep the old one
+        rows = self.writable_rows()
+        row = dict(rows[index])
+        row[attribute] = value
+        rows[index] = row
+
+    def column(self, attribute):
+        return [row.get(attribute) for row in self.rows]
+
+    def codes(self, attribute):
+        # Dictionary-encodes one attribute, returning (codes, code -> value list)
+        lookup = {}
+        codes = [
+            lookup.setdefault(row.get(attribute), len(lookup)) for row in self.rows
+        ]
+        return codes, list(lookup)
+
+    def iter_rows(self, attributes):
+        for row in self.rows:
+            yield tuple(row.get(attr) for attr in attributes)
+
+    def to_dicts(self):
+        return self.rows[:]
+
+    def select(self, attributes, indexes):
+        # Returns a new store holding the given tuples restricted to `attributes`
+        rows = self.rows
+        return RowStore(
+            [{attr: rows[index].get(attr) for attr in attributes} for index in indexes]
+        )
+
+    def copy(self):
+        # Returns a store sharing this one's rows until either of them is modified
+        store = RowStore.__new__(RowStore)
+        store.shared = self.shared.acquire()
+        return store
+
+
+# Copies one column's (codes, code -> value list, value -> code dict) buffers
+def copy_column(column):
+    codes, values, lookup = column
+    return array("q", codes), values[:], dict(lookup)
+
+
+# Class storing relation data column by column: each attribute keeps a dictionary of its
+# distinct values and an integer array of codes into it, one code per tuple. Columns are
+# shared between copies and copied individually, the first time a copy writes to them
+class ColumnStore:
+    def __init__(self, attributes=None):
+        self.length = 0
+        # Maps attribute -> SharedBuffers of (array of value codes, list of distinct
+        # values indexed by code, dict of value -> code)
+        self.columns = {}
+        for attribute in flatten_attributes(attributes):
+            self.add_column(attribute)
+
+    def __del__(self):
+        for column in self.columns.values():
+            column.release()
+
+    def __len__(self):
+        return self.length
+
+    def attributes(self):
+        return list(self.columns)
+
+    def writable_column(self, attribute):
+        # Returns an attribute's buffers, first detaching them from other stores sharing them
+        column = self.columns[attribute] = self.columns[attribute].writable(copy_column)
+        return column.payload
+
+    def add_column(self, attribute):
+        # Adds an attribute, filling existing tuples with None
+        if attribute in self.columns:
+            return
+        if self.length:
+            column = (array("q", [0]) * self.length, [None], {None: 0})
+        else:
+            column = (array("q"), [], {})
+        self.columns[attribute] = SharedBuffers(column)
+
+    def encode(self, attribute, value):
+        # Returns the code of a value, adding it to the attribute's dictionary if new
+        _, values, lookup = self.columns[attribute].payload
+        code = lookup.get(value)
+        if code is None:
+            _, values, lookup = self.writable_column(attribute)
+            code = len(values)
+            lookup[value] = code
+            values.append(value)
+        return code
+
+    def append(self, row):
+        for attribute in row:
+            if attribute not in self.columns:
+                self.add_column(attribute)
+        for attribute in self.columns:
+            code = self.encode(attribute, row.get(attribute))
+            self.writable_column(attribute)[0].append(code)
+        self.length += 1
+
+    def extend(self, attributes, rows):
+        # Appends positional tuples column by column, encoding each attribute in one pass
+        for attribute in attributes:
+            self.add_column(attribute)
+        for position, attribute in enumerate(attributes):
+            codes, values, lookup = self.writable_column(attribute)
+            for row in rows:
+                code = lookup.get(row[position])
+                if code is None:
+                    code = lookup[row[position]] = len(values)
+                    values.append(row[position])
+                codes.append(code)
+        missing = [attr for attr in self.columns if attr not in attributes]
+        for attribute in missing:
+            code = self.encode(attribute, None)
+            self.writable_column(attribute)[0].extend(array("q", [code]) * len(rows))
+        self.length += len(rows)
+
+    def row(self, index):
+        return {
+            attribute: column.payload[1][column.payload[0][index]]
+            for attribute, column in self.columns.items()
+        }
+
+    def value(self, index, attribute):
+        column = self.columns.get(attribute)
+        if column is None:
+            return None
+        codes, values, _ = column.payload
+        return values[codes[index]]
+
+    def set_value(self, index, attribute, value):
+        self.add_column(attribute)
+        code = self.encode(attribute, value)
+        self.writable_column(attribute)[0][index] = code
+
+    def column(self, attribute):
+        if attribute not in self.columns:
+            return [None] * self.length
+        codes, values, _ = self.columns[attribute].payload
+        return [values[code] for code in codes]
+
+    def codes(self, attribute):
+        # Returns the stored (codes, code -> value list) of an attribute without re-encoding
+        if attribute not in self.columns:
+            return array("q", [0]) * self.length, [None]
+        codes, values, _ = self.columns[attribute].payload
+        return codes, values
+
+    def iter_rows(self, attributes):
+        columns = [self.column(attr) for attr in attributes]
+        if not columns:
+            return iter([()] * self.length)
+        return zip(*columns)
+
+    def to_dicts(self):
+        attributes = self.attributes()
+        return [dict(zip(attributes, row)) for row in self.iter_rows(attributes)]
+
+    def select(self, attributes, indexes):
+        # Returns a new store holding the given tuples restricted to `attributes`; value
+        # dictionaries are copied as-is, so codes stay valid
+        store = ColumnStore()
+        store.length = len(indexes)
+        for attribute in attributes:
+            if attribute not in self.columns:
+                store.add_column(attribute)
+                continue
+            codes, values, lookup = self.columns[attribute].payload
+            if numpy is not None and indexes:
+                selected = array("q")
+                selected.frombytes(
+                    numpy.frombuffer(codes, dtype=numpy.int64)[indexes].tobytes()
+                )
+            else:
+                selected = array("q", [codes[index] for index in indexes])
+            store.columns[attribute] = SharedBuffers(
+                (selected, values[:], dict(lookup))
+            )
+        return store
+
+    def copy(self):
+        # Returns a store sharing this one's columns until either of them is modified
+        store = ColumnStore()
+        store.length = self.length
+        for attribute, column in self.columns.items():
+            store.columns[attribute] = column.acquire()
+        return store
+
+
+# Describes a tuple violating an FD: its index, the FD, the determinant values and the
+# dependent values already indexed for them versus the ones found
+def fd_violation(row_index, fd, X, Y, key, expected, found):
+    return {
+        "row": row_index,
+        "fd": fd,
+        "determinant": dict(zip(X, key)),
+        "expected": dict(zip(Y, expected)),
+        "found": dict(zip(Y, found)),
+        "message": (
+            f"Tuple {row_index} violates {fd}: {dict(zip(X, key))} determines "
+            f"{dict(zip(Y, expected))}, got {dict(zip(Y, found))}."
+        ),
+    }
+
+
+# Class indexing a relation's tuples by the values of a (possibly composite) key: each key
+# value maps to its first tuple, and values held by several tuples are tracked separately,
+# so lookups and duplicate queries take O(1)
+class KeyIndex:
+    __slots__ = ("attributes", "rows", "duplicates")
+
+    def __init__(self, attributes):
+        self.attributes = attributes
+        self.rows = {}  # Maps key value tuple -> index of the first tuple holding it
+        self.duplicates = (
+            {}
+        )  # Maps key value tuple -> indexes of all tuples holding it, if several
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, key):
+        return tuple(key) in self.rows
+
+    def add(self, key, row_index):
+        # Indexes one tuple under its key value
+        first = self.rows.setdefault(key, row_index)
+        if first != row_index:
+            self.duplicates.setdefault(key, [first]).append(row_index)
+            if row_index < first:
+                self.rows[key] = row_index
+
+    def remove(self, key, row_index):
+        # Removes one tuple from the index, e.g. before its key value changes
+        rows = self.duplicates.get(key)
+        if rows is None:
+            if self.rows.get(key) == row_index:
+                del self.rows[key]
+            return
+        rows.remove(row_index)
+        self.rows[key] = min(rows)
+        if len(rows) == 1:
+            del self.duplicates[key]
+
+    def lookup(self, key):
+        # Returns the index of the first tuple holding a key value, or None
+        return self.rows.get(tuple(key))
+
+    def is_duplicate(self, key):
+        # Checks whether several tuples hold the same key value
+        return tuple(key) in self.duplicates
+
+    def duplicate_rows(self):
+        # Returns, in tuple order, the indexes of tuples repeating an earlier tuple's key value
+        return sorted(
+            row_index
+            for key, rows in self.duplicates.items()
+            for row_index in rows
+            if row_index != self.rows[key]
+        )
+
+
+# Attribute lists at most this long are searched directly, which is as fast as hashing
+LOOKUP_THRESHOLD = 8
+
+
+# Class behaving like a plain list of attribute names whose membership tests take O(1): a
+# list longer than LOOKUP_THRESHOLD builds a set of its names on its first membership test,
+# and any change to the list discards it, so short lists carry no extra memory
+class AttributeList(list):
+    __slots__ = ("lookup",)
+
+    def __init__(self, items=()):
+        super().__init__(items)
+        self.lookup = None
+
+    def __contains__(self, item):
+        if len(self) > LOOKUP_THRESHOLD:
+            try:
+                if self.lookup is None:
+                    self.lookup = frozenset(self)
+                return item in self.lookup
+            except TypeError:
+                pass  # Unhashable items (nested key lists) are searched directly
+        return list.__contains__(self, item)
+
+    def __reduce__(self):
+        return AttributeList, (list(self),)
+
+    def append(self, item):
+        super().append(item)
+        self.lookup = None
+
+    def extend(self, items):
+        super().extend(items)
+        self.lookup = None
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def __imul__(self, times):
+        super().__imul__(times)
+        self.lookup = None
+        return self
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        self.lookup = None
+
+    def remove(self, item):
+        super().remove(item)
+        self.lookup = None
+
+    def pop(self, index=-1):
+        self.lookup = None
+        return super().pop(index)
+
+    def clear(self):
+        super().clear()
+        self.lookup = None
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self.lookup = None
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self.lookup = None
+
+
 # Class representing a Relation with attributes and constraints
 class Relation:
-    def __init__(self, name, attributes):
+    __slots__ = (
+        "name",
+        "_attributes",
+        "_primary_key",
+        "foreign_keys",
+        "candidate_keys",
+        "_functional_dependencies",
+        "_fd_keys",
+        "_store",
+        "_closure",
+        "_closure_signature",
+        "_fd_check_mode",
+        "_fd_indexes",
+        "fd_violations",
+        "_key_indexes",
+    )
+
+    def __init__(self, name, attributes, columnar=False):
         # Initializes the relation with a name and a list of attributes
         self.name = name
         self.attributes = attributes
@@ -34,7 +812,25 @@ class Relation:
         self.foreign_keys = []  # Stores foreign keys
         self.candidate_keys = []  # Stores candidate keys
         self.functional_dependencies = []  # Stores functional dependencies (FDs)
-        self.data = []  # Stores data tuples for the relation
+        self._fd_keys = None  # Lazily built set of stored FDs, used to skip duplicates
+        # Stores data tuples for the relation, row by row or dictionary-encoded by column
+        self._store = ColumnStore(attributes) if columnar else RowStore()
+        self._closure = None  # Cached AttributeClosure built from the FDs
+        self._closure_signature = (
+            None  # Schema snapshot the cached closure was built from
+        )
+        self._fd_check_mode = (
+            None  # "reject" or "report" to validate inserts against the FDs
+        )
+        self._fd_indexes = (
+            None  # Lazily built per-FD hash indexes: determinant -> dependent
+        )
+        self.fd_violations = (
+            []
+        )  # Violations found while checking inserts against the FDs
+        self._key_indexes = (
+            {}
+        )  # Maps key attribute tuple -> KeyIndex, maintained on insert
 
     def add_primary_key(self, key):
         # Adds a primary key or appends to it if it’s a composite key
@@ -62,6 +858,34 @@ class Relation:
         if attribute not in self.attributes:
             self.attributes.append(attribute)
 
+    @property
+    def attributes(self):
+        return self._attributes
+
+    @attributes.setter
+    def attributes(self, attributes):
+        # Keeps the attributes in an AttributeList for O(1) membership tests
+        self._attributes = AttributeList(attributes)
+
+    @property
+    def primary_key(self):
+        return self._primary_key
+
+    @primary_key.setter
+    def primary_key(self, key):
+        self._primary_key = AttributeList(key)
+
+    @property
+    def functional_dependencies(self):
+        return self._functional_dependencies
+
+    @functional_dependencies.setter
+    def functional_dependencies(self, dependencies):
+        # Replacing the FD list invalidates the duplicate-detection set and the FD indexes
+        self._functional_dependencies = dependencies
+        self._fd_keys = None
+        self._fd_indexes = None
+
     def add_functional_dependency(self, X, Y):
         # Adds a functional dependency if all attributes in X and Y exist in relation's attributes
         all_attributes = [
@@ -70,47 +894,492 @@ class Relation:
             for attr in (sublist if isinstance(sublist, list) else [sublist])
         ]
         if all(attr in self.attributes for attr in all_attributes):
-            self.functional_dependencies.append(FunctionalDependency(X, Y))
+            if self._fd_keys is None:
+                self._fd_keys = set(self.functional_dependencies)
+
+            # Skips FDs that are already stored, regardless of attribute order
+            fd = FunctionalDependency(X, Y)
+            if fd not in self._fd_keys:
+                self._fd_keys.add(fd)
+                self.functional_dependencies.append(fd)
+                self._fd_indexes = None
         else:
             # Tracks any missing attributes in case some attributes do not exist in the relation
             missing_attrs = [
                 attr for attr in all_attributes if attr not in self.attributes
             ]
 
+    def primary_key_sets(self):
+        # Returns the declared primary key(s) as lists of attribute names; nested lists
+        # hold one composite key each, while top-level names form a single key together
+        key_sets = []
+        single_key = []
+        for key in self.primary_key:
+            if isinstance(key, (list, tuple)):
+                attributes = flatten_attributes(key)
+                if attributes:
+                    key_sets.append(attributes)
+            else:
+                single_key.extend(flatten_attributes(key))
+        if single_key:
+            key_sets.insert(0, flatten_attributes(single_key))
+        return key_sets
+
+    def closure_engine(self):
+        # Returns an AttributeClosure over the relation's FDs, rebuilt only when the schema changed;
+        # every declared primary key also contributes the implicit FD key -> all attributes
+        attributes = flatten_attributes(self.attributes)
+        dependencies = [
+            (flatten_attributes(fd.get_x()), flatten_attributes(fd.get_y()))
+            for fd in self.functional_dependencies
+        ]
+        key_sets = self.primary_key_sets()
+        signature = (
+            tuple(attributes),
+            tuple((tuple(X), tuple(Y)) for X, Y in dependencies),
+            tuple(tuple(key) for key in key_sets),
+        )
+
+        if self._closure is None or self._closure_signature != signature:
+            closure = AttributeClosure(attributes, dependencies)
+            for key in key_sets:
+                closure.add_dependency_masks(closure.encode(key), closure.universe)
+            self._closure = closure
+            self._closure_signature = signature
+        return self._closure
+
+    def closure(self, attributes):
+        # Returns the closure of the given attributes under the relation's FDs
+        return self.closure_engine().attribute_closure(attributes)
+
+    def is_superkey(self, attributes):
+        # Checks whether the given attributes functionally determine the whole relation
+        closure = self.closure_engine()
+        return closure.is_superkey(closure.encode(attributes))
+
+    def minimal_cover(self):
+        # Returns a minimal cover of the relation's FDs, one dependent attribute per FD
+        closure = AttributeClosure(
+            flatten_attributes(self.attributes),
+            [(fd.get_x(), fd.get_y()) for fd in self.functional_dependencies],
+        )
+        return [
+            FunctionalDependency(closure.decode(X), closure.decode(Y))
+            for X, Y in closure.minimal_cover()
+        ]
+
+    def canonical_cover(self):
+        # Returns the minimal cover with FDs sharing a determinant merged into one
+        grouped = {}
+        for fd in self.minimal_cover():
+            key = tuple(fd.get_x())
+            if key in grouped:
+                grouped[key].Y = grouped[key].get_y() + fd.get_y()
+            else:
+                grouped[key] = fd
+        return list(grouped.values())
+
+    def reduce_functional_dependencies(self):
+        # Replaces the stored FDs with their canonical cover
+        self.functional_dependencies = self.canonical_cover()
+
+    def find_candidate_keys(self, limit=None, time_budget=None):
+        # Lists the relation's candidate keys derived from its FDs and declared primary key;
+        # stops after `limit` keys or `time_budget` seconds when either is given
+        closure = self.closure_engine()
+        return [
+            closure.decode(key)
+            for key in closure.candidate_keys(limit=limit, time_budget=time_budget)
+        ]
+
+    @property
+    def data(self):
+        # Returns the tuples as a tuple of read-only mappings (columnar relations build them
+        # on demand); the stored tuples are only changed through the relation's methods, so
+        # writes to this snapshot raise instead of being silently lost
+        return tuple(MappingProxyType(row) for row in self._store.to_dicts())
+
+    @data.setter
+    def data(self, rows):
+        # Replaces the tuples, keeping the relation's current storage layout
+        if isinstance(self._store, ColumnStore):
+            store = ColumnStore(self.attributes)
+            for row in rows:
+                store.append(row)
+            self._store = store
+        else:
+            # Rows may be the read-only mappings `data` returns, so they are stored as dicts
+            self._store = RowStore([dict(row) for row in rows])
+        self.reset_indexes()
+
+    def is_columnar(self):
+        # Checks whether the relation stores its data in the columnar layout
+        return isinstance(self._store, ColumnStore)
+
+    def use_columnar_storage(self):
+        # Converts the stored tuples to the dictionary-encoded columnar layout
+        if not self.is_columnar():
+            rows = self._store.to_dicts()
+            self._store = ColumnStore(self.attributes)
+            for row in rows:
+                self._store.append(row)
+
+    def row_count(self):
+        # Returns the number of stored tuples
+        return len(self._store)
+
+    def data_attributes(self):
+        # Returns the attribute names present in the stored tuples
+        return self._store.attributes()
+
+    def row(self, index):
+        # Returns one tuple as a dictionary
+        return self._store.row(index)
+
+    def set_value(self, index, attribute, value):
+        # Updates one value of a stored tuple, moving it within the key indexes using it
+        changed = []
+        for key_index in self._key_indexes.values():
+            if attribute in key_index.attributes:
+                key_index.remove(self.key_value(index, key_index.attributes), index)
+                changed.append(key_index)
+        self._store.set_value(index, attribute, value)
+        for key_index in changed:
+            key_index.add(self.key_value(index, key_index.attributes), index)
+        self._fd_indexes = None
+
+    def column(self, attribute):
+        # Returns every value of one attribute, in tuple order
+        return self._store.column(attribute)
+
+    def column_codes(self, attribute):
+        # Returns one attribute dictionary-encoded as integer codes, one per tuple
+        return self._store.codes(attribute)[0]
+
+    def value_counts(self, attribute):
+        # Returns (value, number of tuples holding it) for every distinct value of one
+        # attribute, counted from its dictionary encoding; values no tuple uses any more
+        # (columnar dictionaries can outlive replaced values) are left out
+        codes, values = self._store.codes(attribute)
+        if numpy is not None and len(codes):
+            counts = numpy.bincount(
+                numpy.asarray(codes), minlength=len(values)
+            ).tolist()
+        else:
+            counts = [0] * len(values)
+            for code in codes:
+                counts[code] += 1
+        return [(values[code], count) for code, count in enumerate(counts) if count]
+
+    def iter_rows(self, attributes=None):
+        # Yields each tuple as a plain tuple of values for the given attributes
+        attributes = flatten_attributes(
+            self.attributes if attributes is None else attributes
+        )
+        return self._store.iter_rows(attributes)
+
+    def distinct_row_indexes(self, attributes, method="hash"):
+        # Returns the index of the first tuple of every distinct combination of values of
+        # `attributes`, in tuple order. "hash" keeps a set of encoded value tuples; "sort"
+        # sorts the tuple indexes by their codes instead, using less memory on wide keys
+        columns = [
+            self._store.codes(attr)[0] for attr in flatten_attributes(attributes)
+        ]
+        count = len(self._store)
+        increment_counter("rows_scanned", count)
+        if not columns:
+            return [0] if count else []
+
+        if method == "hash":
+            seen = set()
+            indexes = []
+            for index, key in enumerate(zip(*columns)):
+                if key not in seen:
+                    seen.add(key)
+                    indexes.append(index)
+            return indexes
+
+        if method != "sort":
+            raise ValueError(f"Unknown projection method: '{method}'.")
+
+        if numpy is not None:
+            matrix = numpy.array(
+                [numpy.asarray(column, dtype=numpy.int64) for column in columns]
+            )
+            # lexsort is stable, so the first index of each run is its first occurrence
+            order = numpy.lexsort(matrix[::-1])
+            ordered = matrix[:, order]
+            starts = numpy.ones(count, dtype=bool)
+            starts[1:] = (ordered[:, 1:] != ordered[:, :-1]).any(axis=0)
+            return sorted(order[starts].tolist())
+
+        order = sorted(
+            range(count), key=lambda index: [column[index] for column in columns]
+        )
+        indexes = []
+        previous = None
+        for index in order:
+            key = [column[index] for column in columns]
+            if key != previous:
+                indexes.append(index)
+                previous = key
+        return sorted(indexes)
+
+    def load_projection(self, relation, method="hash"):
+        # Replaces this relation's tuples with the distinct tuples of another relation projected
+        # onto this relation's attributes
+        attributes = flatten_attributes(self.attributes)
+        indexes = relation.distinct_row_indexes(attributes, method)
+        self._store = relation._store.select(attributes, indexes)
+        self.reset_indexes()
+
+    def project(self, attributes, name=None, method="hash"):
+        # Returns a new relation over `attributes` holding this relation's distinct tuples
+        # projected onto them (set semantics), in the same storage layout
+        attributes = flatten_attributes(attributes)
+        relation = Relation(self.name if name is None else name, attributes[:])
+        relation.load_projection(self, method)
+        return relation
+
+    def copy_data(self, relation):
+        # Replaces this relation's tuples with another relation's tuples; both relations share
+        # the stored data and copy it only when one of them modifies it
+        self._store = relation._store.copy()
+        self.reset_indexes()
+
+    def copy(self, with_data=True):
+        # Returns an independent copy of the relation's schema, FDs and (optionally) data
+        relation = Relation(
+            self.name,
+            [attr[:] if isinstance(attr, list) else attr for attr in self.attributes],
+        )
+        relation.primary_key = [
+            key[:] if isinstance(key, list) else key for key in self.primary_key
+        ]
+        relation.candidate_keys = [key[:] for key in self.candidate_keys]
+        relation.foreign_keys = [key[:] for key in self.foreign_keys]
+        relation.functional_dependencies = [
+            FunctionalDependency(fd.get_x()[:], fd.get_y()[:])
+            for fd in self.functional_dependencies
+        ]
+        if with_data:
+            relation.copy_data(self)
+        elif self.is_columnar():
+            relation._store = ColumnStore(self.attributes)
+        return relation
+
+    def reset_indexes(self):
+        # Drops the indexes built over the stored tuples; they are rebuilt when next needed
+        self._fd_indexes = None
+        self._key_indexes = {}
+
+    def key_value(self, index, attributes):
+        # Returns the values of the given attributes in one stored tuple
+        return tuple(self._store.value(index, attr) for attr in attributes)
+
+    def key_index(self, attributes=None):
+        # Returns the KeyIndex over the given key (default: the whole primary key), built with
+        # one scan on first use and then kept current as tuples are added or updated
+        attributes = tuple(
+            flatten_attributes(self.primary_key if attributes is None else attributes)
+        )
+        key_index = self._key_indexes.get(attributes)
+        if key_index is None:
+            key_index = KeyIndex(attributes)
+            for row_index, values in enumerate(self.iter_rows(attributes)):
+                key_index.add(values, row_index)
+            self._key_indexes[attributes] = key_index
+        return key_index
+
+    def candidate_key_indexes(self):
+        # Returns a secondary KeyIndex for every declared candidate key
+        return [
+            self.key_index(key)
+            for key in self.candidate_keys
+            if flatten_attributes(key)
+        ]
+
+    def index_new_tuples(self, start, rows, attributes=None):
+        # Adds tuples just stored from index `start` on to every built key index
+        positions = None
+        if attributes is not None:
+            positions = {
+                attr: i for i, attr in enumerate(flatten_attributes(attributes))
+            }
+        for key_index in self._key_indexes.values():
+            if positions is None:
+                for offset, row in enumerate(rows):
+                    key = tuple(row.get(attr) for attr in key_index.attributes)
+                    key_index.add(key, start + offset)
+            else:
+                columns = [positions.get(attr) for attr in key_index.attributes]
+                for offset, row in enumerate(rows):
+                    key = tuple(None if p is None else row[p] for p in columns)
+                    key_index.add(key, start + offset)
+
+    def check_functional_dependencies(self, mode="reject"):
+        # Validates every later insert against the declared FDs: "reject" raises a ValueError
+        # for tuples violating an FD, "report" stores them and records each violation in
+        # fd_violations, and None stops checking
+        if mode not in ("reject", "report", None):
+            raise ValueError(f"Unknown functional dependency check mode: '{mode}'.")
+        self._fd_check_mode = mode
+        self.reset_indexes()
+
+    def functional_dependency_indexes(self):
+        # Returns one (FD, X, Y, index) entry per checkable FD, where the index maps each
+        # determinant value tuple to its dependent value tuple. Built with one scan of the
+        # stored tuples, which also resets fd_violations to the violations present in them
+        if self._fd_indexes is None:
+            self._fd_indexes = []
+            self.fd_violations = []
+            for fd in self.functional_dependencies:
+                X = flatten_attributes(fd.get_x())
+                Y = [attr for attr in flatten_attributes(fd.get_y()) if attr not in X]
+                if not Y or not all(attr in self.attributes for attr in X + Y):
+                    continue
+                index = {}
+                for row_index, values in enumerate(self.iter_rows(X + Y)):
+                    key, value = values[: len(X)], values[len(X) :]
+                    expected = index.setdefault(key, value)
+                    if expected != value:
+                        self.fd_violations.append(
+                            fd_violation(row_index, fd, X, Y, key, expected, value)
+                        )
+                self._fd_indexes.append((fd, X, Y, index))
+        return self._fd_indexes
+
+    def check_tuples(self, rows, attributes=None):
+        # Checks tuples about to be stored against the FD indexes (rows are dictionaries, or
+        # value sequences ordered like `attributes`), including conflicts among the new tuples
+        # themselves. In "reject" mode a violation raises before any index changes; otherwise
+        # the indexes learn the new tuples and violations are added to fd_violations
+        positions = None
+        if attributes is not None:
+            positions = {
+                attr: i for i, attr in enumerate(flatten_attributes(attributes))
+            }
+
+        start = len(self._store)
+        updates = []
+        violations = []
+        for fd, X, Y, index in self.functional_dependency_indexes():
+            if positions is None:
+                lhs = rhs = None
+            else:
+                lhs = [positions.get(attr) for attr in X]
+                rhs = [positions.get(attr) for attr in Y]
+            pending = {}
+            for offset, row in enumerate(rows):
+                if positions is None:
+                    key = tuple(row.get(attr) for attr in X)
+                    value = tuple(row.get(attr) for attr in Y)
+                else:
+                    key = tuple(None if p is None else row[p] for p in lhs)
+                    value = tuple(None if p is None else row[p] for p in rhs)
+                expected = pending.get(key)
+                if expected is None:
+                    expected = index.get(key)
+                if expected is None:
+                    pending[key] = value
+                elif expected != value:
+                    violations.append(
+                        fd_violation(start + offset, fd, X, Y, key, expected, value)
+                    )
+            updates.append((index, pending))
+
+        if violations and self._fd_check_mode == "reject":
+            more = f" ({len(violations)} violations)" if len(violations) > 1 else ""
+            raise ValueError(violations[0]["message"] + more)
+        for index, pending in updates:
+            index.update(pending)
+        self.fd_violations.extend(violations)
+        return violations
+
     def add_tuple(self, data_instance):
         # Adds a tuple of data to the relation, ensuring it matches the relation's attributes
+        # and, when FD checking is enabled, the relation's FDs
         if len(data_instance) != len(self.attributes):
             raise ValueError(
                 f"Expected {len(self.attributes)} attributes, got {len(data_instance)}."
             )
-        self.data.append(data_instance)
+        if self._fd_check_mode is not None:
+            self.check_tuples([data_instance])
+        self._store.append(data_instance)
+        if self._key_indexes:
+            self.index_new_tuples(len(self._store) - 1, [data_instance])
 
-    def print_relation(self):
-        # Prints the details of the relation, including its attributes, keys, and FDs
-        print(f"\nRelation: {self.name}")
-        print(f"Attributes: {', '.join(map(str, self.attributes))}")
-        print(f"Primary Key: {', '.join(map(str, self.primary_key))}")
+    def add_tuples(self, rows, attributes=None):
+        # Adds many tuples at once; with `attributes`, rows are value sequences in that
+        # order, otherwise dictionaries. Arity is checked like add_tuple before anything is stored
+        for row in rows:
+            if len(row) != len(self.attributes):
+                raise ValueError(
+                    f"Expected {len(self.attributes)} attributes, got {len(row)}."
+                )
+        if self._fd_check_mode is not None:
+            self.check_tuples(rows, attributes)
+        start = len(self._store)
+        if attributes is None:
+            for row in rows:
+                self._store.append(row)
+        else:
+            self._store.extend(flatten_attributes(attributes), rows)
+        if self._key_indexes:
+            self.index_new_tuples(start, rows, attributes)
+
+    def to_dict(self):
+        # Returns the relation's schema and tuple count as JSON-serializable data
+        return {
+            "name": str(self.name),
+            "attributes": flatten_attributes(self.attributes),
+            "primary_key": self.primary_key_sets(),
+            "candidate_keys": [
+                key for key in map(flatten_attributes, self.candidate_keys) if key
+            ],
+            "foreign_keys": [
+                key for key in map(flatten_attributes, self.foreign_keys) if key
+            ],
+            "functional_dependencies": [
+                {
+                    "X": flatten_attributes(fd.get_x()),
+                    "Y": flatten_attributes(fd.get_y()),
+                }
+                for fd in self.functional_dependencies
+            ],
+            "rows": self.row_count(),
+        }
+
+    def format_relation(self):
+        # Yields the lines describing the relation: its attributes, keys, and FDs
+        yield f"\nRelation: {self.name}"
+        yield f"Attributes: {', '.join(map(str, self.attributes))}"
+        yield f"Primary Key: {', '.join(map(str, self.primary_key))}"
 
         if self.candidate_keys:
-            print("Candidate Keys:")
+            yield "Candidate Keys:"
             for candidate_key in self.candidate_keys:
-                print(f"  - {', '.join(map(str, candidate_key))}")
+                yield f"  - {', '.join(map(str, candidate_key))}"
         else:
-            print("Candidate Keys: None")
+            yield "Candidate Keys: None"
 
         if self.foreign_keys:
-            print("Foreign Keys:")
+            yield "Foreign Keys:"
             for foreign_key in self.foreign_keys:
-                print(f"  - {', '.join(map(str, foreign_key))}")
+                yield f"  - {', '.join(map(str, foreign_key))}"
         else:
-            print("Foreign Keys: None")
+            yield "Foreign Keys: None"
 
         if self.functional_dependencies:
-            print("Functional Dependencies:")
+            yield "Functional Dependencies:"
             for fd in self.functional_dependencies:
-                print(f"  - {fd}")
+                yield f"  - {fd}"
         else:
-            print("Functional Dependencies: None")
+            yield "Functional Dependencies: None"
+
+    def print_relation(self):
+        # Sends the details of the relation to the current output sink
+        get_output_sink().relation(self)
 
     def __repr__(self):
         # Returns a string representation of the relation with its main properties
@@ -0,0 +1,169 @@
+import contextlib
+import fnmatch
+import hashlib
+import json
+
+# --------------------------------- Fingerprint Functions ---------------------------------
+
+
+# Returns a short digest of a relation's schema: its attributes, primary key and FDs. The
+# relation's name is left out, since stages rename the relations they produce
+def relation_fingerprint(relation):
+    if relation is None:
+        return ""
+    schema = {
+        "attributes": [str(attr) for attr in relation.attributes],
+        "primary_key": json.loads(json.dumps(relation.primary_key, default=str)),
+        "functional_dependencies": sorted(
+            json.dumps([fd.get_x(), fd.get_y()], default=str)
+            for fd in relation.functional_dependencies
+        ),
+    }
+    text = json.dumps(schema, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+# Returns the key decisions are memoized under: the relation fingerprint, the attribute and
+# the question, plus the value and tuple the question is about (a duplicate key value is
+# asked about once per tuple). Keys are JSON strings so caches can be saved to a file
+def decision_key(kind, question, relation=None, attribute=None, value=None, row=None):
+    return json.dumps(
+        [relation_fingerprint(relation), str(attribute), kind, question, value, row],
+        default=str,
+    )
+
+
+# --------------------------------- Decision Providers ---------------------------------
+
+
+# Class answering the questions normalization asks ("atomic": is an attribute atomic,
+# "duplicate_key": a new value for a repeated primary key value). Answers are memoized by
+# decision_key, so a question already answered for the same schema is never asked again;
+# subclasses implement answer()
+class DecisionProvider:
+    def __init__(self, cache=None):
+        self.cache = {} if cache is None else cache  # Maps decision key -> answer
+
+    def decide(
+        self, kind, question, relation=None, attribute=None, value=None, row=None
+    ):
+        # Returns the memoized answer, asking answer() only on the first occurrence
+        key = decision_key(kind, question, relation, attribute, value, row)
+        if key not in self.cache:
+            self.cache[key] = str(
+                self.answer(kind, question, relation, attribute, value)
+            )
+        return self.cache[key]
+
+    def answer(self, kind, question, relation, attribute, value):
+        raise ValueError(f"No answer for question: {question}")
+
+    def is_interactive(self):
+        # Checks whether answers come from the user, which worker processes cannot ask
+        return False
+
+    def save(self, path):
+        # Writes every answer given so far, for replay by a RecordedProvider
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.cache, file, indent=2)
+            file.write("\n")
+
+
+# Class asking the user on stdin, as the command-line program always has
+class InteractiveProvider(DecisionProvider):
+    def answer(self, kind, question, relation, attribute, value):
+        return input(question)
+
+    def is_interactive(self):
+        return True
+
+
+# Class answering from a list of rules, for unattended runs. Each rule is a dict with an
+# "answer" and optionally the "kind" and "attribute" (a name, fnmatch pattern or list of
+# them) it applies to; the first matching rule answers. A string answer is formatted with
+# {value}, {attribute} and {count} (how often the rule has answered), and a callable is
+# called with (kind, question, relation, attribute, value)
+class RuleProvider(DecisionProvider):
+    def __init__(self, rules=None, cache=None):
+        super().__init__(cache)
+        self.rules = [dict(rule) for rule in rules or []]
+        self.counts = [0] * len(self.rules)
+
+    def matches(self, rule, kind, attribute):
+        if "kind" in rule and rule["kind"] != kind:
+            return False
+        if "attribute" not in rule:
+            return True
+        patterns = rule["attribute"]
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        name = str(attribute).strip()
+        return any(
+            fnmatch.fnmatchcase(name, str(pattern).strip()) for pattern in patterns
+        )
+
+    def answer(self, kind, question, relation, attribute, value):
+        for index, rule in enumerate(self.rules):
+            if self.matches(rule, kind, attribute):
+                self.counts[index] += 1
+                if callable(rule["answer"]):
+                    return rule["answer"](kind, question, relation, attribute, value)
+                return str(rule["answer"]).format(
+                    value=value, attribute=attribute, count=self.counts[index]
+                )
+        return super().answer(kind, question, relation, attribute, value)
+
+
+# Class replaying answers saved by DecisionProvider.save (a path or a dict of decision
+# key -> answer); questions without a recorded answer go to `fallback`, whose answers are
+# recorded too, or raise ValueError without one
+class RecordedProvider(DecisionProvider):
+    def __init__(self, answers, fallback=None):
+        if isinstance(answers, str):
+            with open(answers, encoding="utf-8") as file:
+                answers = json.load(file)
+        super().__init__(dict(answers))
+        self.fallback = fallback
+
+    def answer(self, kind, question, relation, attribute, value):
+        if self.fallback is None:
+            return super().answer(kind, question, relation, attribute, value)
+        return self.fallback.answer(kind, question, relation, attribute, value)
+
+    def is_interactive(self):
+        return self.fallback is not None and self.fallback.is_interactive()
+
+
+# --------------------------------- Provider Selection ---------------------------------
+
+# Provider answering normalization questions; the user on stdin by default
+decision_provider = InteractiveProvider()
+
+
+# Returns the provider currently answering normalization questions
+def get_decision_provider():
+    return decision_provider
+
+
+# Replaces the provider answering normalization questions and returns the previous one
+def set_decision_provider(provider):
+    global decision_provider
+    previous = decision_provider
+    decision_provider = provider
+    return previous
+
+
+# Answers normalization questions with a provider for the duration of the block, then
+# restores the previous provider
+@contextlib.contextmanager
+def use_decision_provider(provider):
+    previous = set_decision_provider(provider)
+    try:
+        yield provider
+    finally:
+        set_decision_provider(previous)
+
+
+# Asks the current provider a normalization question of the given kind
+def decide(kind, question, relation=None, attribute=None, value=None, row=None):
+    return decision_provider.decide(kind, question, relation, attribute, value, row)
@@ -0,0 +1,730 @@
+import json
+import re
+from collections import Counter
+from itertools import combinations, repeat
+from operator import itemgetter
+
+from classes import *
+
+# --------------------------------- Partition Functions ---------------------------------
+
+
+# Returns one attribute of a relation's data dictionary-encoded as integer codes;
+# columnar relations already store them, so nothing is re-encoded
+def encode_column(relation, attribute):
+    return relation.column_codes(attribute)
+
+
+# Combines several encoded columns into one code per row, numbering each distinct value tuple
+def combine_codes(columns):
+    if len(columns) == 1:
+        return columns[0]
+    dictionary = {}
+    return [dictionary.setdefault(key, len(dictionary)) for key in zip(*columns)]
+
+
+# Builds the stripped partition (position-list index) of a column: groups of row
+# positions sharing a value, with singleton groups left out
+def stripped_partition(codes):
+    if numpy is not None and len(codes):
+        # Sorting the codes puts equal values next to each other; runs longer than one are groups
+        codes = numpy.asarray(codes)
+        order = numpy.argsort(codes, kind="stable")
+        boundaries = numpy.flatnonzero(numpy.diff(codes[order])) + 1
+        starts = numpy.concatenate(([0], boundaries))
+        ends = numpy.concatenate((boundaries, [len(codes)]))
+        kept = ends - starts > 1
+        order = order.tolist()
+        return [
+            order[start:end]
+            for start, end in zip(starts[kept].tolist(), ends[kept].tolist())
+        ]
+
+    groups = {}
+    for row, code in enumerate(codes):
+        groups.setdefault(code, []).append(row)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+# Returns the TANE error measure e(X) = ||pi|| - |pi| of a stripped partition;
+# X -> A holds exactly when e(X) == e(X u {A})
+def partition_error(partition):
+    return sum(len(group) for group in partition) - len(partition)
+
+
+# Computes the stripped partition of X u Y from those of X and Y, reusing `table`
+# (one slot per row, initially all -1) to avoid allocating per call
+def partition_product(first, second, table):
+    for index, group in enumerate(first):
+        for row in group:
+            table[row] = index
+
+    buckets = [[] for _ in first]
+    product = []
+    for group in second:
+        touched = []
+        for row in group:
+            index = table[row]
+            if index >= 0:
+                bucket = buckets[index]
+                if not bucket:
+                    touched.append(index)
+                bucket.append(row)
+        for index in touched:
+            if len(buckets[index]) > 1:
+                product.append(buckets[index])
+            buckets[index] = []
+
+    for group in first:
+        for row in group:
+            table[row] = -1
+    return product
+
+
+# Groups `rows` by integer `keys` into a stripped partition in array form: (rows of the
+# groups of more than one row, their group numbers 0..count-1, count), both int32 to halve
+# the memory a lattice level holds. Keys spanning a small range are counted with bincount;
+# wider ones are sorted by numpy.unique
+def group_rows(rows, keys):
+    if not len(keys):
+        return rows, keys, 0
+    span = int(keys.max()) + 1
+    if span <= 4 * len(keys):
+        counts = numpy.bincount(keys, minlength=span)
+        inverse = keys
+    else:
+        _, inverse, counts = numpy.unique(keys, return_inverse=True, return_counts=True)
+        inverse = inverse.ravel()
+    shared = counts > 1
+    kept = shared[inverse]
+    numbers = (numpy.cumsum(shared) - 1).astype(numpy.int32)
+    return rows[kept], numbers[inverse[kept]], int(numpy.count_nonzero(shared))
+
+
+# Builds the stripped partition of a column as NumPy arrays (see group_rows)
+def stripped_partition_array(codes):
+    codes = numpy.asarray(codes, dtype=numpy.int64)
+    return group_rows(numpy.arange(len(codes), dtype=numpy.int32), codes)
+
+
+# Returns e(X) of a stripped partition in array form
+def partition_array_error(partition):
+    return len(partition[0]) - partition[2]
+
+
+# Computes the array-form stripped partition of X u Y from those of X and Y; `table` is a
+# NumPy array with one slot per row, all -1 between calls
+def partition_array_product(first, second, table):
+    rows, numbers, _ = first
+    table[second[0]] = second[1]
+    other = table[rows]
+    table[second[0]] = -1
+    kept = other >= 0
+    keys = numbers[kept].astype(numpy.int64) * second[2] + other[kept]
+    return group_rows(rows[kept], keys)
+
+
+# --------------------------------- Discovery Functions ---------------------------------
+
+
+# Generates the next lattice level from sets sharing all but their highest attribute,
+# keeping only candidates whose every subset survived pruning
+def generate_next_level(level):
+    surviving = set(level)
+    blocks = {}
+    for mask in sorted(level):
+        prefix = mask & ~(1 << (mask.bit_length() - 1))
+        blocks.setdefault(prefix, []).append(mask)
+
+    next_level = []
+    for block in blocks.values():
+        for i, first in enumerate(block):
+            for second in block[i + 1 :]:
+                candidate = first | second
+                if all(
+                    candidate & ~(1 << position) in surviving
+                    for position in iterate_bits(candidate)
+                ):
+                    next_level.append((candidate, first, second))
+    return next_level
+
+
+# Checks whether one of the recorded determinants (a set of masks) is a subset of `mask`;
+# the subsets of `mask` are looked up when there are fewer of them than determinants, so
+# key pruning stays cheap when many FDs have been found
+def has_subset_determinant(determinants, mask):
+    if 1 << bin(mask).count("1") > len(determinants):
+        return any(lhs & ~mask == 0 for lhs in determinants)
+    subset = mask
+    while subset:
+        if subset in determinants:
+            return True
+        subset = (subset - 1) & mask
+    return 0 in determinants
+
+
+# Mines all minimal non-trivial FDs that hold in the relation's data with TANE: a
+# level-wise walk over the attribute lattice using stripped partitions, right-hand
+# candidate sets (C+) and key pruning; `max_lhs` caps the determinant size
+def discover_functional_dependencies(relation, max_lhs=None, apply=False):
+    attributes = flatten_attributes(relation.attributes)
+    row_count = relation.row_count()
+    if not attributes or not row_count:
+        return []
+
+    closure = AttributeClosure(attributes)
+    universe = closure.universe
+
+    # With NumPy, partitions are kept as arrays and multiplied with vectorized grouping
+    if numpy is not None:
+        build, product, error = (
+            stripped_partition_array,
+            partition_array_product,
+            partition_array_error,
+        )
+        table = numpy.full(row_count, -1, dtype=numpy.int32)
+    else:
+        build, product, error = stripped_partition, partition_product, partition_error
+        table = [-1] * row_count
+
+    partitions = {}
+    errors = {0: row_count - 1}
+    for attribute in attributes:
+        mask = closure.encode([attribute])
+        partitions[mask] = build(encode_column(relation, attribute))
+        errors[mask] = error(partitions[mask])
+
+    candidates = {0: universe}  # C+ of the previous level, keyed by attribute mask
+    found = {position: set() for position in range(len(attributes))}
+    discovered = []
+    level = list(partitions)
+    size = 1
+
+    while level:
+        # Compute dependencies X \ {A} -> A for the current level
+        level_candidates = {}
+        for mask in level:
+            rhs_candidates = universe
+            for position in iterate_bits(mask):
+                rhs_candidates &= candidates.get(mask & ~(1 << position), 0)
+
+            for position in iterate_bits(mask & rhs_candidates):
+                lhs = mask & ~(1 << position)
+                if errors[lhs] == errors[mask]:
+                    discovered.append((lhs, position))
+                    found[position].add(lhs)
+                    rhs_candidates &= ~(1 << position)
+                    rhs_candidates &= mask
+            level_candidates[mask] = rhs_candidates
+
+        # Prune sets with no candidates left, and (super)keys after emitting their FDs
+        surviving = []
+        for mask in level:
+            rhs_candidates = level_candidates[mask]
+            if not rhs_candidates:
+                continue
+            if errors[mask] == 0:
+                if max_lhs is None or size <= max_lhs:
+                    for position in iterate_bits(rhs_candidates & ~mask):
+                        if not has_subset_determinant(found[position], mask):
+                            discovered.append((mask, position))
+                            found[position].add(mask)
+                continue
+            surviving.append(mask)
+
+        if max_lhs is not None and size > max_lhs:
+            break
+
+        # Build the next level, deriving each partition as the product of two parents;
+        # a parent's partition is dropped after its last product, so memory peaks at about
+        # one level rather than two. Past `max_lhs` only the errors are kept, since that
+        # level is checked but never multiplied
+        keep = max_lhs is None or size < max_lhs
+        partitions = {mask: partitions[mask] for mask in surviving}
+        generated = generate_next_level(surviving)
+        last_use = {}
+        for index, (_, first, second) in enumerate(generated):
+            last_use[first] = last_use[second] = index
+        next_partitions = {}
+        next_errors = {}
+        next_level = []
+        for index, (candidate, first, second) in enumerate(generated):
+            partition = product(partitions[first], partitions[second], table)
+            if keep:
+                next_partitions[candidate] = partition
+            next_errors[candidate] = error(partition)
+            next_level.append(candidate)
+            for parent in (first, second):
+                if last_use[parent] == index:
+                    del partitions[parent]
+
+        candidates = level_candidates
+        partitions = next_partitions
+        errors = {**{mask: errors[mask] for mask in level}, **next_errors}
+        level = next_level
+        size += 1
+
+    dependencies = [
+        FunctionalDependency(closure.decode(lhs), [attributes[position]])
+        for lhs, position in discovered
+    ]
+
+    if apply:
+        for fd in dependencies:
+            relation.add_functional_dependency(fd.get_x(), fd.get_y())
+
+    return dependencies
+
+
+# Checks whether the MVD X ->> Y | Z holds in the data, given the encoded X, Y and Z columns:
+# rows are hash-partitioned by X, and each group must contain every (y, z) combination of its
+# Y and Z values, i.e. |distinct (y, z)| == |distinct y| * |distinct z| summed over the groups
+def multivalued_dependency_holds(x_codes, y_codes, z_codes):
+    y_values = set(zip(x_codes, y_codes))
+    z_values = set(zip(x_codes, z_codes))
+    yz_values = set(zip(x_codes, y_codes, z_codes))
+
+    y_counts = {}
+    for x, _ in y_values:
+        y_counts[x] = y_counts.get(x, 0) + 1
+    z_counts = {}
+    for x, _ in z_values:
+        z_counts[x] = z_counts.get(x, 0) + 1
+
+    return len(yz_values) == sum(count * z_counts[x] for x, count in y_counts.items())
+
+
+# Checks whether X ->> Y holds in the relation's data, with Z the remaining attributes
+def check_multivalued_dependency(relation, X, Y):
+    attributes = flatten_attributes(relation.attributes)
+    X = flatten_attributes(X)
+    Y = [attr for attr in flatten_attributes(Y) if attr not in X]
+    Z = [attr for attr in attributes if attr not in X and attr not in Y]
+    if not relation.row_count() or not Y or not Z:
+        return True
+
+    columns = {attr: encode_column(relation, attr) for attr in X + Y + Z}
+    x_codes = (
+        combine_codes([columns[attr] for attr in X])
+        if X
+        else [0] * relation.row_count()
+    )
+    return multivalued_dependency_holds(
+        x_codes,
+        combine_codes([columns[attr] for attr in Y]),
+        combine_codes([columns[attr] for attr in Z]),
+    )
+
+
+# Groups distinct tuples (of attribute codes) by their values at the X positions and
+# returns the groups of two or more tuples, smallest first so failing checks stop early;
+# single-tuple groups cannot break an MVD. With `matrix`, the same tuples as a NumPy code
+# matrix, the X values are combined and partitioned with vectorized operations
+def distinct_tuple_groups(tuples, x_positions, matrix=None):
+    if matrix is not None:
+        key = matrix[:, x_positions[0]]
+        for position in x_positions[1:]:
+            column = matrix[:, position]
+            key = numpy.unique(
+                key * (int(column.max()) + 1) + column, return_inverse=True
+            )[1]
+        groups = [[tuples[row] for row in rows] for rows in stripped_partition(key)]
+    else:
+        x_value = itemgetter(*x_positions)
+        partition = {}
+        for row in tuples:
+            partition.setdefault(x_value(row), []).append(row)
+        groups = [group for group in partition.values() if len(group) > 1]
+    return sorted(groups, key=len)
+
+
+# Checks X ->> Y | Z on groups from distinct_tuple_groups: each group's tuples must be
+# every combination of its Y values and its Z values. Y and Z are positions in the
+# tuples, Y being the smaller side. Every Y value of a product occurs equally often, which
+# is checked before projecting Z; the check stops at the first group that fails
+def multivalued_dependency_holds_in_groups(groups, y_positions, z_positions):
+    y_value = itemgetter(*y_positions)
+    z_value = itemgetter(*z_positions)
+    for tuples in groups:
+        y_counts = Counter(map(y_value, tuples))
+        if len(set(y_counts.values())) != 1:
+            return False
+        if len(y_counts) * len(set(map(z_value, tuples))) != len(tuples):
+            return False
+    return True
+
+
+# Splits attribute positions into the components an MVD split can never cut: two
+# attributes whose value pairs are not every combination of their values in some group
+# must land on the same side, since the projection of a product is a product. Pairs
+# already joined are not checked again, and only `sample` groups spread over all sizes
+# are examined: a missed dependency only leaves more splits for the full check to reject
+def dependent_components(groups, positions, sample=64):
+    groups = groups[:: max(1, len(groups) // sample)]
+    parents = list(range(len(positions)))
+
+    def find(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    for first, second in combinations(range(len(positions)), 2):
+        if find(first) == find(second):
+            continue
+        pair = itemgetter(positions[first], positions[second])
+        for tuples in groups:
+            pairs = set(map(pair, tuples))
+            a_values = {a_value for a_value, _ in pairs}
+            b_values = {b_value for _, b_value in pairs}
+            if len(a_values) * len(b_values) != len(pairs):
+                parents[find(second)] = find(first)
+                break
+
+    components = {}
+    for index in range(len(positions)):
+        components.setdefault(find(index), []).append(index)
+    return list(components.values())
+
+
+# Finds non-trivial MVDs X ->> Y | Z in the relation's data whose determinant X is not a
+# superkey (neither by the FDs nor in the data), reporting the smaller side Y for each X.
+# Determinants are tried up to `max_lhs` attributes and splits up to `max_rhs` attributes
+# on the smaller side. Distinct tuples are grouped by X once per determinant; attributes X
+# determines through the FDs are left out of the splits, since X ->> A already follows from
+# X -> A, and only splits keeping each dependent component on one side are tested
+def find_multivalued_dependencies(relation, max_lhs=None, max_rhs=None):
+    attributes = flatten_attributes(relation.attributes)
+    row_count = relation.row_count()
+    if len(attributes) < 3 or row_count < 2:
+        return []
+
+    # MVDs hold or fail on the set of distinct tuples, so repeated tuples are dropped once
+    tuples = list(
+        dict.fromkeys(zip(*(encode_column(relation, attr) for attr in attributes)))
+    )
+    matrix = None
+    if numpy is not None:
+        matrix = numpy.array(tuples, dtype=numpy.int64).reshape(
+            len(tuples), len(attributes)
+        )
+    position = {attr: index for index, attr in enumerate(attributes)}
+    closure = relation.closure_engine()
+
+    mvds = []
+    reported = []
+    max_lhs = len(attributes) - 2 if max_lhs is None else max_lhs
+    for size in range(1, max_lhs + 1):
+        for X in combinations(attributes, size):
+            X = list(X)
+            if any(set(previous) <= set(X) for previous in reported):
+                continue
+            if relation.is_superkey(X):
+                continue
+            determined = closure.closure(closure.encode(X))
+            rest = [
+                attr
+                for attr in attributes
+                if attr not in X and not determined & closure.encode(attr)
+            ]
+            if len(rest) < 2:
+                continue
+
+            groups = distinct_tuple_groups(
+                tuples, [position[attr] for attr in X], matrix
+            )
+            if not groups:
+                continue
+            components = dependent_components(groups, [position[attr] for attr in rest])
+            if len(components) < 2:
+                continue
+
+            # Candidate sides are unions of components, smallest first; an even split is
+            # tried once, from the side holding the first attribute
+            largest = (
+                len(rest) // 2 if max_rhs is None else min(max_rhs, len(rest) // 2)
+            )
+            candidates = []
+            for count in range(1, min(len(components) - 1, largest) + 1):
+                for chosen in combinations(components, count):
+                    side = sorted(index for component in chosen for index in component)
+                    if len(side) > largest:
+                        continue
+                    if 2 * len(side) == len(rest) and side[0] != 0:
+                        continue
+                    candidates.append(side)
+            candidates.sort(key=lambda side: (len(side), side))
+
+            for side in candidates:
+                Y = [rest[index] for index in side]
+                Z = [attr for attr in rest if attr not in Y]
+                if multivalued_dependency_holds_in_groups(
+                    groups,
+                    [position[attr] for attr in Y],
+                    [position[attr] for attr in Z],
+                ):
+                    mvds.append((X, Y))
+                    reported.append(X)
+                    break
+
+    return mvds
+
+
+# Orders JD components so that each one shares attributes with those before it when
+# possible, letting every hash join probe on a key instead of forming a cross product
+def order_components(components):
+    remaining = [list(component) for component in components]
+    ordered = [
+        remaining.pop(max(range(len(remaining)), key=lambda i: len(remaining[i])))
+    ]
+    bound = set(ordered[0])
+    while remaining:
+        index = max(
+            range(len(remaining)),
+            key=lambda i: (len(bound & set(remaining[i])), -len(remaining[i])),
+        )
+        ordered.append(remaining.pop(index))
+        bound.update(ordered[-1])
+    return ordered
+
+
+# Counts the tuples of the natural join of the data's projections onto `components`,
+# stopping as soon as the count exceeds `limit`; projections are hashed on the
+# attributes they share with the components joined before them
+def count_projection_join(relation, components, limit):
+    attributes = flatten_attributes(relation.attributes)
+    columns = {attr: encode_column(relation, attr) for attr in attributes}
+    position = {attr: i for i, attr in enumerate(attributes)}
+    rows = relation.row_count()
+
+    steps = []
+    bound = []
+    for component in order_components(components):
+        shared = [attr for attr in component if attr in bound]
+        new = [attr for attr in component if attr not in bound]
+        index = {}
+        for key, values in zip(
+            zip(*[columns[attr] for attr in shared]) if shared else repeat((), rows),
+            zip(*[columns[attr] for attr in new]) if new else repeat((), rows),
+        ):
+            index.setdefault(key, set()).add(values)
+        steps.append(
+            (
+                [position[attr] for attr in shared],
+                [position[attr] for attr in new],
+                {key: list(values) for key, values in index.items()},
+            )
+        )
+        bound.extend(new)
+
+    assignment = [None] * len(attributes)
+    count = 0
+
+    # Extends a partial join tuple one component at a time (depth-first, pipelined)
+    def extend(step):
+        nonlocal count
+        if step == len(steps):
+            count += 1
+            return count <= limit
+        shared, new, index = steps[step]
+        for values in index.get(tuple(assignment[i] for i in shared), ()):
+            for i, value in zip(new, values):
+                assignment[i] = value
+            if not extend(step + 1):
+                return False
+        return True
+
+    extend(0)
+    return count
+
+
+# Checks whether the data satisfies the join dependency *(components), i.e. joining its
+# projections back together yields exactly the distinct original tuples
+def check_join_dependency(relation, components):
+    attributes = flatten_attributes(relation.attributes)
+    if not relation.row_count():
+        return True
+    if set(flatten_attributes(components)) != set(attributes):
+        return False
+
+    distinct_rows = len(
+        set(zip(*[encode_column(relation, attr) for attr in attributes]))
+    )
+    return count_projection_join(relation, components, distinct_rows) == distinct_rows
+
+
+# Finds a non-trivial join dependency that holds in the data and is not implied by keys.
+# If any non-trivial JD holds, the JD over all (n - 1)-attribute components holds too,
+# so that one is tested first and then reduced by dropping unneeded components
+def find_join_dependencies(relation):
+    attributes = flatten_attributes(relation.attributes)
+    if len(attributes) < 3 or relation.row_count() < 2:
+        return []
+
+    components = [
+        [other for other in attributes if other != attr] for attr in attributes
+    ]
+    if not check_join_dependency(relation, components):
+        return []
+
+    for component in components[:]:
+        remaining = [other for other in components if other is not component]
+        if set(flatten_attributes(remaining)) == set(
+            attributes
+        ) and check_join_dependency(relation, remaining):
+            components = remaining
+
+    # A JD whose components are all superkeys is implied by the keys
+    if all(relation.is_superkey(component) for component in components):
+        return []
+    return [components]
+
+
+# --------------------------------- Atomicity Functions ---------------------------------
+
+# Separators whose presence in many values suggests a column holds lists
+LIST_DELIMITERS = [",", ";", "|"]
+
+# Attribute names ending in a number, e.g. phone1 or phone_2; the stem must be a word
+REPEATING_GROUP_NAME = re.compile(r"^([A-Za-z][A-Za-z_ ]*?[A-Za-z])[_ ]?(\d+)$")
+
+# Numbers written with thousands separators, which are not lists
+GROUPED_NUMBER = re.compile(r"^[-+]?\d{1,3}(,\d{3})+(\.\d+)?$")
+
+
+# Returns how a single value is composite: ("json", value) for a JSON array or object,
+# (delimiter, value) for a short delimiter-separated list, or None for an atomic value
+def composite_value_kind(value, delimiters):
+    if isinstance(value, (list, tuple, set, dict)):
+        return "json"
+    text = str(value).strip()
+    if text[:1] in "[{" and text[-1:] in "]}":
+        try:
+            if isinstance(json.loads(text), (list, dict)):
+                return "json"
+        except ValueError:
+            pass
+    if GROUPED_NUMBER.match(text):
+        return None
+    for delimiter in delimiters:
+        if delimiter in text:
+            parts = [part.strip() for part in text.split(delimiter)]
+            if all(parts) and all(len(part) <= 64 for part in parts):
+                return delimiter
+    return None
+
+
+# Groups attributes named like a repeating group (phone1, phone2, ...) by their stem;
+# only stems shared by two or more attributes are returned
+def find_repeating_groups(attributes):
+    groups = {}
+    for attribute in attributes:
+        match = REPEATING_GROUP_NAME.match(str(attribute).strip())
+        if match:
+            groups.setdefault(match.group(1).lower(), []).append(attribute)
+    return {stem: members for stem, members in groups.items() if len(members) > 1}
+
+
+# Scans the distinct values of one attribute, given as (value, tuple count) pairs, in
+# chunks, and counts the tuples holding composite values per kind. With NumPy, each chunk is
+# first filtered with vectorized substring tests so only values that can be composite are
+# inspected one by one. Returns ({kind: tuples}, {kind: sample values}, non-empty tuples,
+# {delimiter: set of item counts of its lists})
+def scan_attribute_values(value_counts, delimiters, chunk_size, sample_size):
+    counts = {}
+    samples = {}
+    lengths = {}
+    total = 0
+    for start in range(0, len(value_counts), chunk_size):
+        chunk = [
+            (value, count)
+            for value, count in value_counts[start : start + chunk_size]
+            if value is not None and str(value).strip()
+        ]
+        total += sum(count for _, count in chunk)
+        if (
+            numpy is not None
+            and chunk
+            and all(isinstance(value, str) for value, _ in chunk)
+        ):
+            text = numpy.char.lstrip(
+                numpy.array([value for value, _ in chunk], dtype=str)
+            )
+            candidate = numpy.char.startswith(text, "[") | numpy.char.startswith(
+                text, "{"
+            )
+            for delimiter in delimiters:
+                candidate |= numpy.char.find(text, delimiter) >= 0
+            chunk = [chunk[index] for index in numpy.flatnonzero(candidate).tolist()]
+        for value, count in chunk:
+            kind = composite_value_kind(value, delimiters)
+            if kind is not None:
+                counts[kind] = counts.get(kind, 0) + count
+                if len(samples.setdefault(kind, [])) < sample_size:
+                    samples[kind].append(value)
+                if kind != "json":
+                    lengths.setdefault(kind, set()).add(str(value).count(kind) + 1)
+    return counts, samples, total, lengths
+
+
+# Judges from the stored tuples whether each attribute of a relation is atomic. Values are
+# read dictionary-encoded, so each distinct value is examined once. An attribute gets a
+# confidence that it is non-atomic: the share of its tuples holding JSON arrays or objects
+# or delimiter-separated lists, smoothed by `prior` pseudo-tuples so that few tuples give
+# a score near 0.5. Lists that all have the same number of items may as well be structured
+# atomic values ("Doe, John"), so they score at most 0.5. Non-key attributes named like a
+# repeating group score `group_confidence` when there are no values to scan, and 0.5 when
+# the scanned values look atomic. Returns one report per attribute, in attribute order:
+# {"attribute", "kind", "confidence", "values" (non-empty tuples), "evidence"}
+def find_non_atomic_attributes(
+    relation,
+    delimiters=None,
+    chunk_size=10000,
+    sample_size=3,
+    prior=4,
+    group_confidence=0.95,
+):
+    delimiters = LIST_DELIMITERS if delimiters is None else delimiters
+    attributes = flatten_attributes(relation.attributes)
+    data_attributes = relation.data_attributes() if relation.row_count() else []
+    key_attributes = set(flatten_attributes(relation.primary_key))
+
+    grouped = {}
+    for members in find_repeating_groups(
+        [attr for attr in attributes if attr not in key_attributes]
+    ).values():
+        for attribute in members:
+            grouped[attribute] = [member for member in members if member != attribute]
+
+    reports = []
+    for attribute in attributes:
+        counts, samples, total, lengths = {}, {}, 0, {}
+        if attribute in data_attributes:
+            counts, samples, total, lengths = scan_attribute_values(
+                relation.value_counts(attribute), delimiters, chunk_size, sample_size
+            )
+
+        kind = max(counts, key=counts.get) if counts else None
+        composites = sum(counts.values())
+        confidence = (
+            (composites + prior / 2) / (total + prior) if total + prior else 0.5
+        )
+        evidence = samples.get(kind, [])[:]
+        if len(lengths.get(kind, ())) == 1:
+            confidence = min(confidence, 0.5)
+        if kind is None and attribute in grouped:
+            # The name alone cannot overrule values that look atomic; that case is asked about
+            kind = "repeating_group"
+            confidence = 0.5 if total else group_confidence
+            evidence = grouped[attribute][:sample_size]
+
+        reports.append(
+            {
+                "attribute": attribute,
+                "kind": kind,
+                "confidence": confidence,
+                "values": total,
+                "evidence": evidence,
+            }
+        )
+    return reports
@@ -0,0 +1,225 @@
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+# --------------------------------- Spans ---------------------------------
+
+
+# Class recording one timed call: its name, start and end (seconds since the tracer
+# started), nesting depth, attributes such as the relation name, and the counters
+# incremented while it was the innermost open span
+class Span:
+    __slots__ = ("name", "attributes", "start", "end", "depth", "thread", "counters")
+
+    def __init__(self, name, attributes, start, depth, thread):
+        self.name = name
+        self.attributes = attributes
+        self.start = start
+        self.end = None
+        self.depth = depth
+        self.thread = thread
+        self.counters = {}
+
+    def duration(self):
+        return (self.end if self.end is not None else self.start) - self.start
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration(),
+            "depth": self.depth,
+            "thread": self.thread,
+            "attributes": self.attributes,
+            "counters": self.counters,
+        }
+
+
+# --------------------------------- Exporters ---------------------------------
+
+
+# Class receiving every finished span; the base class discards them
+class SpanExporter:
+    def export(self, span):
+        pass
+
+    def close(self):
+        pass
+
+
+# Class keeping finished spans in memory, with a per-name summary for finding hot spots
+class MemoryExporter(SpanExporter):
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def summary(self):
+        # Returns name -> {"calls", "seconds", "counters"}, slowest names first
+        totals = {}
+        for span in self.spans:
+            entry = totals.setdefault(
+                span.name, {"calls": 0, "seconds": 0.0, "counters": {}}
+            )
+            entry["calls"] += 1
+            entry["seconds"] += span.duration()
+            for name, amount in span.counters.items():
+                entry["counters"][name] = entry["counters"].get(name, 0) + amount
+        return dict(sorted(totals.items(), key=lambda item: -item[1]["seconds"]))
+
+
+# Class writing one JSON object per finished span to a file (JSON lines)
+class JsonlExporter(SpanExporter):
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def export(self, span):
+        self.file.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+# Class writing finished spans in the Chrome trace event format, viewable in
+# chrome://tracing or Perfetto; the file is written when the tracer is closed
+class ChromeTraceExporter(SpanExporter):
+    def __init__(self, path):
+        self.path = path
+        self.events = []
+
+    def export(self, span):
+        self.events.append(
+            {
+                "name": span.name,
+                "cat": span.name.split("_", 1)[0],
+                "ph": "X",
+                "ts": span.start * 1e6,
+                "dur": span.duration() * 1e6,
+                "pid": os.getpid(),
+                "tid": span.thread,
+                "args": dict(span.attributes, **span.counters),
+            }
+        )
+
+    def close(self):
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": self.events}, file, default=str)
+
+
+# --------------------------------- Tracer ---------------------------------
+
+
+# Class timing nested spans and counting events, passing finished spans to its exporters;
+# counter totals over all spans are kept in `totals`
+class Tracer:
+    def __init__(self, exporters=None):
+        self.exporters = (
+            list(exporters) if exporters is not None else [MemoryExporter()]
+        )
+        self.totals = {}
+        self.origin = time.perf_counter()
+        self.local = threading.local()
+
+    def open_spans(self):
+        # Returns this thread's stack of open spans
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        stack = self.open_spans()
+        span = Span(
+            name,
+            attributes,
+            time.perf_counter() - self.origin,
+            len(stack),
+            threading.get_ident(),
+        )
+        stack.append(span)
+        try:
+            yield span
+        finally:
+            span.end = time.perf_counter() - self.origin
+            stack.pop()
+            for exporter in self.exporters:
+                exporter.export(span)
+
+    def increment(self, name, amount=1):
+        # Adds to a counter of the innermost open span and to the tracer's totals
+        self.totals[name] = self.totals.get(name, 0) + amount
+        stack = self.open_spans()
+        if stack:
+            counters = stack[-1].counters
+            counters[name] = counters.get(name, 0) + amount
+
+    def close(self):
+        for exporter in self.exporters:
+            exporter.close()
+
+
+# --------------------------------- Tracing Functions ---------------------------------
+
+# Tracer receiving spans and counters; None disables tracing
+tracer = None
+
+
+# Returns the current tracer, or None when tracing is disabled
+def get_tracer():
+    return tracer
+
+
+# Replaces the current tracer (None disables tracing) and returns the previous one
+def set_tracer(new_tracer):
+    global tracer
+    previous = tracer
+    tracer = new_tracer
+    return previous
+
+
+# Traces everything inside the block with `new_tracer`, closing it (so file exporters are
+# written) and restoring the previous tracer afterwards
+@contextlib.contextmanager
+def use_tracer(new_tracer):
+    previous = set_tracer(new_tracer)
+    try:
+        yield new_tracer
+    finally:
+        set_tracer(previous)
+        new_tracer.close()
+
+
+# Opens a span on the current tracer; a no-op context when tracing is disabled
+def trace_span(name, **attributes):
+    if tracer is None:
+        return contextlib.nullcontext()
+    return tracer.span(name, **attributes)
+
+
+# Adds to a counter of the innermost open span; does nothing when tracing is disabled
+def increment_counter(name, amount=1):
+    if tracer is not None:
+        tracer.increment(name, amount)
+
+
+# Decorator running each call of a function inside a span named after it; a relation
+# passed first is recorded by name. Disabled tracing costs one global lookup per call
+def traced(function):
+    name = function.__name__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if tracer is None:
+            return function(*args, **kwargs)
+        attributes = {}
+        if args and hasattr(args[0], "attributes") and hasattr(args[0], "name"):
+            attributes["relation"] = str(args[0].name)
+        with tracer.span(name, **attributes):
+            return function(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,103 @@
+import csv
+import json
+import os
+
+from classes import *
+
+# --------------------------------- Chunked Readers ---------------------------------
+
+
+# Yields (header, rows) chunks from a CSV file, at most `chunk_size` rows each; the first
+# line is the header and every row must have one value per header attribute
+def iter_csv_chunks(path, chunk_size=10000, delimiter=",", encoding="utf-8"):
+    with open(path, newline="", encoding=encoding) as file:
+        reader = csv.reader(file, delimiter=delimiter)
+        header = [name.strip() for name in next(reader, [])]
+
+        chunk = []
+        empty = True
+        for row in reader:
+            if not row:
+                continue
+            empty = False
+            if len(row) != len(header):
+                raise ValueError(
+                    f"Line {reader.line_num}: Expected {len(header)} attributes, got {len(row)}."
+                )
+            chunk.append([value.strip() for value in row])
+            if len(chunk) >= chunk_size:
+                yield header, chunk
+                chunk = []
+        # A file with a header and no rows still yields its header
+        if chunk or empty:
+            yield header, chunk
+
+
+# Converts a parsed JSON value into a hashable relation value
+def json_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value.strip() if isinstance(value, str) else value
+
+
+# Yields (header, rows) chunks from a JSON-lines file, one object per line; the
+# attributes of the first object become the header, and every object must have them all
+def iter_jsonl_chunks(path, chunk_size=10000, encoding="utf-8"):
+    header = None
+    chunk = []
+    with open(path, encoding=encoding) as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            record = {
+                str(name).strip(): value for name, value in json.loads(line).items()
+            }
+            if header is None:
+                header = list(record)
+                names = set(header)
+            # Every object must have exactly the header's attributes, whatever their order
+            if record.keys() != names:
+                missing = [name for name in header if name not in record]
+                extra = [name for name in record if name not in names]
+                raise ValueError(
+                    f"Line {line_number}: Expected attributes {header}, "
+                    f"missing {missing}, unexpected {extra}."
+                )
+            chunk.append([json_value(record[name]) for name in header])
+            if len(chunk) >= chunk_size:
+                yield header, chunk
+                chunk = []
+    # A file without objects has no header, so it yields an empty one
+    if chunk or header is None:
+        yield header or [], chunk
+
+
+# Picks the chunked reader for a file from its extension
+def iter_file_chunks(path, chunk_size=10000):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson"):
+        return iter_jsonl_chunks(path, chunk_size)
+    if extension == ".tsv":
+        return iter_csv_chunks(path, chunk_size, delimiter="\t")
+    if extension == ".csv":
+        return iter_csv_chunks(path, chunk_size)
+    raise ValueError(f"Unsupported data file format: '{extension}'.")
+
+
+# --------------------------------- Relation Loading ---------------------------------
+
+
+# Streams a CSV/TSV/JSON-lines file into a relation chunk by chunk. Without a relation,
+# one is created from the file header (columnar, so only encoded values are kept), even
+# when no rows follow it; with one, the header must name exactly the relation's attributes
+def load_relation_data(path, relation=None, name=None, chunk_size=10000):
+    for header, rows in iter_file_chunks(path, chunk_size):
+        if relation is None:
+            relation_name = name or os.path.splitext(os.path.basename(path))[0]
+            relation = Relation(relation_name, header[:], columnar=True)
+        elif header and set(header) != set(flatten_attributes(relation.attributes)):
+            raise ValueError(
+                f"File attributes {header} do not match relation attributes {relation.attributes}."
+            )
+        relation.add_tuples(rows, attributes=header)
+    return relation
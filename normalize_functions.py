@@ -1,38 +1,191 @@
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+
 from classes import *
+from decision_providers import *
+from discovery_functions import *
 from helper_functions import *
+from instrumentation import *
+from verification_functions import *
 
 # --------------------------------- Print Functions ---------------------------------
 
 
 # Prints a divider line for visual clarity in console output
 def print_divider():
-    print("\n-------------------------\n")
+    get_output_sink().divider()
 
 
 # Prints the name of the current normalization stage with dividers
 def print_normalization_stage(stage_name):
-    print_divider()
-    print(stage_name)
-    print_divider()
+    get_output_sink().stage(stage_name)
 
 
 # Prints the data of a relation in a table format, with attribute names as headers
 def print_data(relation):
-    if not relation.data:
-        print("No data available in relation.")
-        return
-
-    # Print attribute names as headers
-    print("\nData:")
-    print(" | ".join(relation.attributes))
-    print("-" * (len(relation.attributes) * 15))
-
-    # Print each row by accessing data as dictionaries
-    for data_dict in relation.data:
-        print(
-            " | ".join(str(data_dict[attr]).ljust(15) for attr in relation.attributes)
+    get_output_sink().data(relation)
+
+
+# --------------------------------- Prompt Functions ---------------------------------
+
+# How detect_1NF_anomalies decides atomicity: "auto" judges each attribute from the stored
+# tuples and asks only when the evidence is ambiguous, "prompt" asks about every attribute,
+# and "data" never asks, treating ambiguous attributes as atomic
+atomicity_checks = "auto"
+
+# Confidence at or below which an attribute is atomic, and at or above which it is
+# non-atomic, without asking
+atomicity_thresholds = (0.1, 0.9)
+
+
+# Returns how detect_1NF_anomalies currently decides atomicity
+def get_atomicity_checks():
+    return atomicity_checks
+
+
+# Sets how detect_1NF_anomalies decides atomicity ("auto", "prompt" or "data") and,
+# optionally, the (atomic, non-atomic) confidence thresholds; returns the previous mode
+def set_atomicity_checks(mode, thresholds=None):
+    global atomicity_checks, atomicity_thresholds
+    if mode not in ("auto", "prompt", "data"):
+        raise ValueError(f"Unknown atomicity check mode: '{mode}'.")
+    previous = atomicity_checks
+    atomicity_checks = mode
+    if thresholds is not None:
+        atomicity_thresholds = tuple(thresholds)
+    return previous
+
+
+# --------------------------------- Parallel Functions ---------------------------------
+
+# Process pool running per-relation detectors inside each stage; None runs them in-process
+detector_executor = None
+
+
+# Sets the executor used for per-relation detectors (None disables parallel detection)
+def set_detector_executor(executor):
+    global detector_executor
+    detector_executor = executor
+
+
+# Runs the detectors of every stage on a process pool for the duration of the block
+@contextlib.contextmanager
+def parallel_detectors(workers=None):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        set_detector_executor(executor)
+        try:
+            yield executor
+        finally:
+            set_detector_executor(None)
+
+
+# Runs a detector over relations, on the detector executor when one is set; results keep
+# the input order. Schema-only detectors get copies without data to keep pickling cheap
+def map_detector(detector, relations, needs_data=False):
+    if detector_executor is None or len(relations) < 2:
+        return [detector(rel) for rel in relations]
+    payload = (
+        relations if needs_data else [rel.copy(with_data=False) for rel in relations]
+    )
+    return list(detector_executor.map(detector, payload))
+
+
+# Normalizes independent relations on a process pool, returning each relation's list of
+# normalized relations in input order; `provider` (default: the current decision provider)
+# answers the workers' questions and must be picklable and non-interactive, since workers
+# have no stdin to ask the user on
+def normalize_relations_in_parallel(
+    relations, normalize_function, workers=None, provider=None
+):
+    provider = provider if provider is not None else get_decision_provider()
+    if provider.is_interactive():
+        raise ValueError(
+            "Parallel normalization needs a non-interactive decision provider "
+            "(e.g. a RuleProvider or RecordedProvider without an interactive fallback)."
+        )
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=set_decision_provider,
+        initargs=(provider,),
+    ) as executor:
+        return list(executor.map(normalize_function, relations))
+
+
+# --------------------------------- Verification Functions ---------------------------------
+
+# How each stage's decompositions are verified: "warn" reports failures through the output
+# sink, "raise" rejects them with a ValueError, and None skips the checks
+decomposition_checks = "warn"
+
+
+# Returns how decompositions are currently verified after each stage
+def get_decomposition_checks():
+    return decomposition_checks
+
+
+# Sets how decompositions are verified after each stage ("warn", "raise" or None) and
+# returns the previous mode
+def set_decomposition_checks(mode):
+    global decomposition_checks
+    if mode not in ("warn", "raise", None):
+        raise ValueError(f"Unknown decomposition check mode: '{mode}'.")
+    previous = decomposition_checks
+    decomposition_checks = mode
+    return previous
+
+
+# List collecting the problems verify_decomposition reports, when one is being recorded
+decomposition_problems = None
+
+
+# Collects the problems decompositions report during the block into the list it yields, for
+# callers whose output sink discards messages
+@contextlib.contextmanager
+def record_decomposition_problems():
+    global decomposition_problems
+    previous = decomposition_problems
+    decomposition_problems = []
+    try:
+        yield decomposition_problems
+    finally:
+        decomposition_problems = previous
+
+
+# Reports a decomposition problem through the output sink and records it when recording
+def report_decomposition_problem(template, *args):
+    if decomposition_problems is not None:
+        decomposition_problems.append(template.format(*args))
+    get_output_sink().message(template, *args)
+
+
+# Checks that a stage's decomposition of a relation is lossless, reporting or rejecting it
+# according to the current decomposition_checks mode, and reports the FDs it no longer
+# preserves; returns whether it is lossless. `use_data` also accepts decompositions whose
+# projections join back to the parent's tuples
+@traced
+def verify_decomposition(parent_relation, decomposed_relations, use_data=False):
+    if decomposition_checks is None or decomposed_relations == [parent_relation]:
+        return True
+
+    names = ", ".join(str(relation.name) for relation in decomposed_relations)
+    lost = find_lost_dependencies(parent_relation, decomposed_relations)
+    if lost:
+        # Losing FDs is sometimes unavoidable (e.g. for BCNF), so it is only reported
+        report_decomposition_problem(
+            "Decomposition of relation {} into {} does not preserve: {}",
+            parent_relation.name,
+            names,
+            ", ".join(map(str, lost)),
         )
-    print()
+
+    if check_lossless_join(parent_relation, decomposed_relations, use_data):
+        return True
+
+    problem = f"Decomposition of relation {parent_relation.name} into {names} is not lossless."
+    if decomposition_checks == "raise":
+        raise ValueError(problem)
+    report_decomposition_problem("{}", problem)
+    return False
 
 
 # --------------------------------- Fix relations if they have anomalies ---------------------------------
@@ -60,6 +213,7 @@ def remove_duplicate_attributes(attributes):
 
 
 # Fixes non-atomic attributes in a parent relation by creating new relations in 1NF
+@traced
 def fix_non_atomic_attributes(parent_relation, anomalies):
     relations_in_1NF = []
 
@@ -90,6 +244,7 @@ def fix_non_atomic_attributes(parent_relation, anomalies):
 
 
 # Fixes partial functional dependencies by creating relations in 2NF from a parent relation
+@traced
 def fix_partial_functional_dependencies(parent_relation, anomalies):
     relations_in_2NF = []
     all_parent_attributes = [str(attr).strip() for attr in parent_relation.attributes]
@@ -120,121 +275,231 @@ def fix_partial_functional_dependencies(parent_relation, anomalies):
     return relations_in_2NF
 
 
-# Fixes transitive functional dependencies, producing relations in 3NF
+# Fixes transitive functional dependencies, producing relations in 3NF: each violating
+# determinant X gets a relation over X and the non-prime attributes it determines, keyed on
+# X, and the parent keeps its primary key and every attribute not moved out.
+# Determinants reaching the fewest attributes are split off first, so a chain a -> b -> c
+# yields (b, c) and (a, b) rather than one relation still holding b -> c
+@traced
 def fix_transitive_functional_dependencies(parent_relation, transitive_dependencies):
     if len(parent_relation.functional_dependencies) < 2:
         return [parent_relation]
 
-    relations_in_3NF = []
-    all_parent_attributes = []
-    for attr in parent_relation.attributes:
-        if isinstance(attr, list):
-            all_parent_attributes.extend(str(sub_attr).strip() for sub_attr in attr)
-        else:
-            all_parent_attributes.append(str(attr).strip())
+    closure = parent_relation.closure_engine()
+    primary_key = flatten_attributes(parent_relation.primary_key)
+    prime_attributes = closure.encode(
+        primary_key
+        + parent_relation.candidate_keys
+        + parent_relation.find_candidate_keys()
+    )
 
-    combined_dependencies = set()
-    for dependency in transitive_dependencies:
-        for attr in dependency.replace("|", ",").split(","):
-            cleaned_attr = attr.strip()
-            if cleaned_attr:
-                combined_dependencies.add(cleaned_attr)
+    # The reported violations, as (X, attributes X determines transitively) masks
+    violations = {}
+    for fd in parent_relation.functional_dependencies:
+        X = closure.encode(fd.get_x())
+        if X in violations or closure.is_superkey(X):
+            continue
+        dependents = closure.closure(X) & closure.universe & ~X & ~prime_attributes
+        anomaly = "|".join(primary_key + closure.decode(X) + closure.decode(dependents))
+        if dependents and anomaly in transitive_dependencies:
+            violations[X] = dependents
+    order = sorted(violations, key=lambda X: bin(violations[X]).count("1"))
+
+    moved = 0
+    schemas = []
+    for X in order:
+        dependents = violations[X] & ~moved
+        if dependents:
+            schemas.append((X, dependents))
+            moved |= dependents
+
+    if moved:
+        print_normalization_stage(
+            "Detected transitive functional dependency attributes: "
+            f"{closure.decode(moved)}"
+        )
+    else:
+        print_normalization_stage("No transitive functional dependencies found.")
+        return [parent_relation]
 
-    combined_dependencies = [
+    # A determinant stays here unless it was moved out with another one's dependents
+    remaining = primary_key + [
         attr
-        for attr in combined_dependencies
-        if attr not in parent_relation.primary_key
+        for attr in remove_duplicate_attributes(parent_relation.attributes)
+        if attr not in primary_key and not closure.encode([attr]) & moved
     ]
 
-    if combined_dependencies:
-        print_normalization_stage(
-            f"Detected transitive functional dependency attributes: {combined_dependencies}"
+    relations_in_3NF = []
+    for X, dependents in schemas:
+        new_relation = Relation(
+            name=f"{parent_relation.name}_{'_'.join(closure.decode(X))}",
+            attributes=closure.decode(X) + closure.decode(dependents),
         )
-    else:
-        print_normalization_stage("No transitive functional dependencies found.")
+        new_relation.add_primary_key(closure.decode(X))
+        relations_in_3NF.append(new_relation)
 
-    new_relation = Relation(
-        name=f"{parent_relation.name}_transitive",
-        attributes=combined_dependencies,
+    remaining_relation = Relation(
+        name=f"{parent_relation.name}_remaining",
+        attributes=remaining,
     )
+    remaining_relation.add_primary_key(primary_key)
+    relations_in_3NF.append(remaining_relation)
+
+    # Each relation carries the FDs projected onto its attributes
+    for new_relation in relations_in_3NF:
+        schema = closure.encode(new_relation.attributes)
+        for lhs_mask, rhs_mask in closure.project_dependencies(schema):
+            new_relation.add_functional_dependency(
+                closure.decode(lhs_mask), closure.decode(rhs_mask)
+            )
 
-    new_relation.add_primary_key(parent_relation.primary_key)
-    new_relation.add_functional_dependency(
-        parent_relation.primary_key, combined_dependencies
-    )
+    return relations_in_3NF
 
-    relations_in_3NF.append(new_relation)
 
-    for attr in combined_dependencies + parent_relation.primary_key:
-        if attr in all_parent_attributes:
-            all_parent_attributes.remove(attr)
+# Synthesizes 3NF relations from a relation's FDs (Bernstein): one relation per determinant
+# of the minimal cover holding the attributes it determines, plus a relation over a
+# candidate key when no synthesized relation contains one. The result is lossless and
+# dependency-preserving; closures come from the relation's cached closure engine
+@traced
+def synthesize_3NF_relations(relation):
+    closure = relation.closure_engine()
+    cover = closure.minimal_cover()
+
+    # Groups the cover's FDs by left-hand side, in first-seen order
+    dependents = {}
+    for lhs_mask, rhs_bit in cover:
+        dependents[lhs_mask] = dependents.get(lhs_mask, 0) | rhs_bit
+    schemas = [
+        (lhs_mask, (lhs_mask | rhs_mask) & closure.universe)
+        for lhs_mask, rhs_mask in dependents.items()
+    ]
 
-    if all_parent_attributes:
-        remaining_relation = Relation(
-            name=f"{parent_relation.name}_remaining",
-            attributes=all_parent_attributes,
+    # Drops relations whose attributes are contained in another relation's
+    schemas = [
+        (lhs_mask, schema)
+        for index, (lhs_mask, schema) in enumerate(schemas)
+        if not any(
+            schema & ~other == 0 and (schema != other or other_index < index)
+            for other_index, (_, other) in enumerate(schemas)
+            if other_index != index
         )
-        remaining_relation.add_primary_key(parent_relation.primary_key)
-        relations_in_3NF.append(remaining_relation)
+    ]
 
-    return relations_in_3NF
+    relations_in_3NF = []
+    for lhs_mask, schema in schemas:
+        new_relation = Relation(
+            name=f"{relation.name}_{'_'.join(closure.decode(lhs_mask))}",
+            attributes=closure.decode(schema),
+        )
+        new_relation.add_primary_key(closure.decode(lhs_mask))
+        for fd_lhs, fd_rhs in dependents.items():
+            if fd_lhs & ~schema == 0 and fd_rhs & schema:
+                new_relation.add_functional_dependency(
+                    closure.decode(fd_lhs), closure.decode(fd_rhs & schema)
+                )
+        relations_in_3NF.append(new_relation)
 
+    if not any(closure.is_superkey(schema) for _, schema in schemas):
+        key = closure.decode(closure.candidate_keys(limit=1)[0])
+        key_relation = Relation(name=f"{relation.name}_key", attributes=key[:])
+        key_relation.add_primary_key(key)
+        relations_in_3NF.append(key_relation)
 
-# Adjusts determinants to equal the primary key, ensuring BCNF compliance
-def determinants_equal_superkey(relation):
-    primary_key = relation.primary_key
-    for fd in relation.functional_dependencies:
-        fd.adjust_to_primary_key(primary_key)
+    for new_relation in relations_in_3NF:
+        new_relation.load_projection(relation)
 
+    return relations_in_3NF
 
-# Fixes multi-valued dependencies (MVDs) to achieve 4NF compliance
-def fix_mvds(relation, mvds):
-    relations_in_4NF = []
-    primary_key = relation.primary_key
-    pk_values = set()
 
-    for data in relation.data:
-        pk_value = tuple(str(data[attr]) for attr in primary_key)
-        print(f"Checking primary key value: {pk_value}")
+# Decomposes a relation into BCNF relations: violating determinants are found with closures,
+# the relation is split on them recursively, and the FDs are projected onto each piece
+@traced
+def fix_BCNF_violations(relation):
+    closure = relation.closure_engine()
+    schemas = closure.bcnf_decomposition()
+    if len(schemas) < 2:
+        return [relation]
 
-        if pk_value in pk_values:
-            print(f"Duplicate primary key value detected: {pk_value}")
-            new_pk_value = input(
-                "Enter a unique primary key value for the duplicate entry in the secondary relation: "
+    relations_in_BCNF = []
+    for schema in schemas:
+        key = closure.decode(closure.minimize_schema_key(schema))
+        new_relation = Relation(
+            name=f"{relation.name}_{'_'.join(key)}",
+            attributes=closure.decode(schema),
+        )
+        new_relation.add_primary_key(key)
+        for lhs_mask, rhs_mask in closure.project_dependencies(schema):
+            new_relation.add_functional_dependency(
+                closure.decode(lhs_mask), closure.decode(rhs_mask)
             )
-            data[primary_key[-1]] = new_pk_value.strip()
-            pk_value = tuple(str(data[attr]) for attr in primary_key)
-            print(f"Updated primary key value to: {pk_value}")
+        new_relation.load_projection(relation)
+        relations_in_BCNF.append(new_relation)
 
-        pk_values.add(pk_value)
+    return relations_in_BCNF
 
-    for X, Y in mvds:
-        non_pk_attributes = [
-            attr for attr in relation.attributes if attr not in primary_key
-        ]
 
-        table1 = Relation(
-            name=f"{relation.name}_{non_pk_attributes[0]}",
-            attributes=X + [non_pk_attributes[0]],
-        )
-        table2 = Relation(
-            name=f"{relation.name}_{non_pk_attributes[1]}",
-            attributes=X + [non_pk_attributes[1]],
+# Fixes multi-valued dependencies (MVDs) to achieve 4NF compliance
+@traced
+def fix_mvds(relation, mvds):
+    relations_in_4NF = []
+    primary_key = flatten_attributes(relation.primary_key)
+
+    # Only tuples repeating a primary key value are visited, through the relation's key index
+    key_index = relation.key_index() if primary_key else None
+    for index in key_index.duplicate_rows() if key_index else []:
+        pk_value = tuple(str(value) for value in relation.key_value(index, primary_key))
+        get_output_sink().message("Duplicate primary key value detected: {}", pk_value)
+        new_pk_value = decide(
+            "duplicate_key",
+            "Enter a unique primary key value for the duplicate entry in the secondary relation: ",
+            relation,
+            primary_key[-1],
+            pk_value[-1],
+            index,
         )
+        relation.set_value(index, primary_key[-1], new_pk_value.strip())
+        pk_value = pk_value[:-1] + (new_pk_value.strip(),)
+        get_output_sink().message("Updated primary key value to: {}", pk_value)
 
-        for data in relation.data:
-            data_table1 = {attr: str(data[attr]) for attr in table1.attributes}
-            data_table2 = {attr: str(data[attr]) for attr in table2.attributes}
-            print(f"Adding data to table1: {data_table1}")
-            print(f"Adding data to table2: {data_table2}")
-            table1.add_tuple(data_table1)
-            table2.add_tuple(data_table2)
+    if not mvds:
+        return [relation]
 
-        table1.add_functional_dependency(X, [non_pk_attributes[0]])
-        table2.add_functional_dependency(X, [non_pk_attributes[1]])
+    # Decomposes on the first MVD X ->> Y | Z into XY and XZ
+    X, Y = mvds[0]
+    Z = [
+        attr
+        for attr in flatten_attributes(relation.attributes)
+        if attr not in X and attr not in Y
+    ]
+
+    # Each half keeps only its distinct tuples
+    table1 = relation.project(X + Y, name=f"{relation.name}_{'_'.join(Y)}")
+    table2 = relation.project(X + Z, name=f"{relation.name}_{'_'.join(Z)}")
+
+    sink = get_output_sink()
+    if sink.shows_messages:
+        for number, table in enumerate((table1, table2), start=1):
+            for index in range(table.row_count()):
+                sink.message("Adding data to table{}: {}", number, table.row(index))
+
+    # Each half carries the FDs projected onto it and is keyed on a candidate key of its own
+    closure = relation.closure_engine()
+    for table in (table1, table2):
+        schema = closure.encode(table.attributes)
+        table.add_primary_key(closure.decode(closure.minimize_schema_key(schema)))
+        for lhs_mask, rhs_mask in closure.project_dependencies(schema):
+            table.add_functional_dependency(
+                closure.decode(lhs_mask), closure.decode(rhs_mask)
+            )
 
-        relations_in_4NF.append(table1)
-        relations_in_4NF.append(table2)
+    # Each half may still hold MVDs of its own
+    for table in (table1, table2):
+        relations_in_4NF.extend(
+            fix_mvds(
+                table,
+                find_multivalued_dependencies(table, MVD_MAX_LHS, MVD_MAX_RHS),
+            )
+        )
 
     return relations_in_4NF
 
@@ -246,40 +511,23 @@ def add_functional_dependency_if_pk_equal(relation, primary_key, X, Y):
 
 
 # Ensures join dependencies are satisfied to achieve 5NF compliance
+@traced
 def ensure_join_dependencies(relation, anomalies):
     new_relations = []
-    decomposed_relations = {}
-
-    for anomaly in anomalies:
-        determinant, dependent = anomaly
-        determinant_key = tuple(determinant)
+    key_sets = relation.primary_key_sets()
 
-        if determinant_key not in decomposed_relations:
-            new_relation = Relation(
-                name=f"{relation.name}_{'_'.join(determinant)}",
-                attributes=determinant + dependent,
-            )
-            new_relation.add_primary_key(determinant)
-            new_relation.add_foreign_key(determinant)
-            decomposed_relations[determinant_key] = new_relation
-            new_relations.append(new_relation)
+    # Decomposes into one relation per component of the first join dependency
+    for component in anomalies[0]:
+        new_relation = Relation(
+            name=f"{relation.name}_{'_'.join(component)}",
+            attributes=component[:],
+        )
 
-        for data in relation.data:
-            new_tuple = {attr: data[attr] for attr in determinant + dependent}
-            decomposed_relations[determinant_key].add_tuple(new_tuple)
+        fitting_keys = [key for key in key_sets if set(key) <= set(component)]
+        new_relation.add_primary_key(fitting_keys[0] if fitting_keys else component)
+        new_relation.load_projection(relation)
 
-    remaining_attributes = [
-        attr
-        for attr in relation.attributes
-        if all(attr not in dep for _, dep in anomalies)
-    ]
-    if remaining_attributes:
-        final_relation = Relation(
-            name=f"{relation.name}_remaining", attributes=remaining_attributes
-        )
-        final_relation.add_primary_key(relation.primary_key)
-        final_relation.data = relation.data[:]
-        new_relations.append(final_relation)
+        new_relations.append(new_relation)
 
     return new_relations
 
@@ -288,8 +536,15 @@ def ensure_join_dependencies(relation, anomalies):
 
 
 # Normalizes a relation to 1NF by eliminating non-atomic attributes
+@traced
 def normalize_1NF(relation):
     print_normalization_stage("1NF Normalization Started")
+    return apply_1NF_stage(relation)
+
+
+# Brings a single relation to 1NF; the stage body shared by normalize_1NF and pipelines
+@traced
+def apply_1NF_stage(relation):
     anomalies = detect_1NF_anomalies(relation)
 
     if anomalies:
@@ -301,16 +556,26 @@ def normalize_1NF(relation):
 
     print_normalization_stage("Relations in 1NF")
 
-    stored_fds = relation.functional_dependencies[:]
-    stored_data = relation.data[:]
+    # Single-attribute right-hand sides, so an FD whose dependents end up in different
+    # relations still reaches each of them
+    stored_fds = relation.minimal_cover()
     final_1NF_relations = []
 
     if anomalies:
         new_relations = fix_non_atomic_attributes(relation, anomalies)
+        verify_decomposition(relation, new_relations)
         for new_relation in new_relations:
+            # FDs fitting in the relation are merged back per determinant
+            fitting = {}
             for fd in stored_fds:
-                new_relation.add_functional_dependency(fd.get_x(), fd.get_y())
-            new_relation.data = stored_data[:]
+                if all(
+                    attr in new_relation.attributes
+                    for attr in flatten_attributes(fd.get_x() + fd.get_y())
+                ):
+                    fitting.setdefault(tuple(fd.get_x()), []).extend(fd.get_y())
+            for X, Y in fitting.items():
+                new_relation.add_functional_dependency(list(X), Y)
+            new_relation.load_projection(relation)
             final_1NF_relations.append(new_relation)
     else:
         final_1NF_relations.append(relation)
@@ -323,27 +588,34 @@ def normalize_1NF(relation):
         final_relation.name = str(count)
         final_relation.print_relation()
 
+    increment_counter("relations_produced", len(final_1NF_relations))
     return final_1NF_relations
 
 
 # Normalizes a relation to 2NF by addressing partial functional dependencies
+@traced
 def normalize_2NF(relation):
     print_normalization_stage("2NF Normalization Started")
-    list_of_1NF_relations = normalize_1NF(relation)
+    return apply_2NF_stage(normalize_1NF(relation))
+
+
+# Brings a list of 1NF relations to 2NF by addressing partial functional dependencies
+@traced
+def apply_2NF_stage(list_of_1NF_relations):
     final_2NF_relations = []
 
-    for rel in list_of_1NF_relations:
-        anomalies = detect_2NF_anomalies(rel)
-        stored_data = rel.data[:]
+    detected = map_detector(detect_2NF_anomalies, list_of_1NF_relations)
+    for rel, anomalies in zip(list_of_1NF_relations, detected):
 
         if anomalies:
             print_normalization_stage(
                 f"Detected partial functional dependencies: {', '.join(anomalies)}"
             )
             new_relations = fix_partial_functional_dependencies(rel, anomalies)
+            verify_decomposition(rel, new_relations)
 
             for new_relation in new_relations:
-                new_relation.data = stored_data[:]
+                new_relation.load_projection(rel)
                 final_2NF_relations.append(new_relation)
         else:
             print_normalization_stage("No partial functional dependencies found.")
@@ -354,27 +626,55 @@ def normalize_2NF(relation):
         final_relation.name = str(count)
         final_relation.print_relation()
 
+    increment_counter("relations_produced", len(final_2NF_relations))
     return final_2NF_relations
 
 
 # Normalizes a relation to 3NF by addressing transitive dependencies
-def normalize_3NF(relation):
+# With `synthesis`, the relations are synthesized from the minimal cover in one pass
+@traced
+def normalize_3NF(relation, synthesis=False):
     print_normalization_stage("3NF Normalization Started")
-    relations = normalize_2NF(relation)
+    if synthesis:
+        return apply_3NF_synthesis(relation)
+    return apply_3NF_stage(normalize_2NF(relation))
+
+
+# Brings a relation to 3NF by Bernstein synthesis instead of the 1NF -> 2NF -> 3NF chain
+@traced
+def apply_3NF_synthesis(relation):
+    print_normalization_stage("Synthesizing 3NF relations from the minimal cover")
+    final_3NF_relations = synthesize_3NF_relations(relation)
+    verify_decomposition(relation, final_3NF_relations)
+
+    print_normalization_stage("Relations in 3NF")
+    for count, final_relation in enumerate(final_3NF_relations, start=1):
+        final_relation.name = str(count)
+        final_relation.print_relation()
+
+    increment_counter("relations_produced", len(final_3NF_relations))
+    return final_3NF_relations
+
+
+# Brings a list of 2NF relations to 3NF by addressing transitive dependencies
+@traced
+def apply_3NF_stage(relations):
     final_3NF_relations = []
 
-    for rel in relations:
-        anomalies = detect_3NF_anomalies(rel)
-        stored_data = rel.data[:]
+    detected = map_detector(detect_3NF_anomalies, relations)
+    for rel, anomalies in zip(relations, detected):
 
         if anomalies:
             print_normalization_stage(
                 f"Detected transitive dependencies: {', '.join(anomalies)}"
             )
             new_relations = fix_transitive_functional_dependencies(rel, anomalies)
+            verify_decomposition(rel, new_relations)
 
             for new_relation in new_relations:
-                new_relation.data = stored_data[:]
+                # A relation returned unchanged already holds its own tuples
+                if new_relation is not rel:
+                    new_relation.load_projection(rel)
                 final_3NF_relations.append(new_relation)
         else:
             print_normalization_stage("No transitive dependencies found.")
@@ -385,26 +685,32 @@ def normalize_3NF(relation):
         final_relation.name = str(count)
         final_relation.print_relation()
 
+    increment_counter("relations_produced", len(final_3NF_relations))
     return final_3NF_relations
 
 
 # Normalizes a relation to BCNF by ensuring every determinant is a superkey
+@traced
 def normalize_BCNF(relation):
     print_normalization_stage("BCNF Normalization Started")
-    list_of_3NF_relations = normalize_3NF(relation)
+    return apply_BCNF_stage(normalize_3NF(relation))
+
+
+# Brings a list of 3NF relations to BCNF by addressing determinants that are not superkeys
+@traced
+def apply_BCNF_stage(list_of_3NF_relations):
     final_BCNF_relations = []
 
-    for rel in list_of_3NF_relations:
-        anomalies = detect_BCNF_anomalies(rel)
-        stored_data = rel.data[:]
+    detected = map_detector(detect_BCNF_anomalies, list_of_3NF_relations)
+    for rel, anomalies in zip(list_of_3NF_relations, detected):
 
         if anomalies:
             print_normalization_stage(
                 f"Detected determinants that are not superkeys: {', '.join(str(anomaly) for anomaly in anomalies)}"
             )
-            determinants_equal_superkey(rel)
-            rel.data = stored_data[:]
-            final_BCNF_relations.append(rel)
+            new_relations = fix_BCNF_violations(rel)
+            verify_decomposition(rel, new_relations)
+            final_BCNF_relations.extend(new_relations)
         else:
             print_normalization_stage("No BCNF violations found.")
             final_BCNF_relations.append(rel)
@@ -415,29 +721,33 @@ def normalize_BCNF(relation):
         final_relation.print_relation()
         print_data(final_relation)
 
+    increment_counter("relations_produced", len(final_BCNF_relations))
     return final_BCNF_relations
 
 
 # Normalizes a relation to 4NF by addressing multi-valued dependencies
+@traced
 def normalize_4NF(relation):
     print_normalization_stage("4NF Normalization Started")
-    bcnf_relations = normalize_BCNF(relation)
+    return apply_4NF_stage(normalize_BCNF(relation))
+
+
+# Brings a list of BCNF relations to 4NF by addressing multi-valued dependencies
+@traced
+def apply_4NF_stage(bcnf_relations):
     final_4NF_relations = []
 
     for bcnf_relation in bcnf_relations:
         mvds = detect_4NF_anomalies(bcnf_relation)
-        stored_fds = bcnf_relation.functional_dependencies[:]
-        stored_data = bcnf_relation.data[:]
 
         if mvds:
             print_normalization_stage(
                 f"Detected multivalued dependencies: {', '.join(str(mvd) for mvd in mvds)}"
             )
             decomposed_relations_4NF = fix_mvds(bcnf_relation, mvds)
-            for rel in decomposed_relations_4NF:
-                rel.functional_dependencies = stored_fds[:]
-                rel.data = stored_data[:]
-                final_4NF_relations.append(rel)
+            verify_decomposition(bcnf_relation, decomposed_relations_4NF, use_data=True)
+            # fix_mvds has already given each relation its key and projected FDs
+            final_4NF_relations.extend(decomposed_relations_4NF)
         else:
             final_4NF_relations.append(bcnf_relation)
 
@@ -447,41 +757,44 @@ def normalize_4NF(relation):
         final_relation.print_relation()
         print_data(final_relation)
 
+    increment_counter("relations_produced", len(final_4NF_relations))
     return final_4NF_relations
 
 
 # Normalizes a relation to 5NF by handling join dependencies
+@traced
 def normalize_5NF(relation):
     print_normalization_stage("5NF Normalization Started")
-    relations = normalize_4NF(relation)
-    final_5NF_relations = []
+    return apply_5NF_stage(normalize_4NF(relation))
+
 
-    for rel in relations:
-        keys = rel.primary_key
+# Brings a list of 4NF relations to 5NF by addressing join dependencies
+@traced
+def apply_5NF_stage(relations):
+    final_5NF_relations = []
 
-        if isinstance(rel.data, list) and all(isinstance(d, dict) for d in rel.data):
-            anomalies = detect_5NF_anomalies(rel)
-            stored_fds = rel.functional_dependencies[:]
-            stored_data = rel.data[:]
+    detected = map_detector(detect_5NF_anomalies, relations, needs_data=True)
+    for rel, anomalies in zip(relations, detected):
+        stored_fds = rel.functional_dependencies[:]
 
-            if anomalies:
-                print_normalization_stage(
-                    f"Detected join dependencies: {', '.join(str(anomaly) for anomaly in anomalies)}"
-                )
-                list_of_5NF_relations = ensure_join_dependencies(rel, anomalies)
-                for decomposed_relation in list_of_5NF_relations:
-                    for fd in stored_fds:
-                        add_functional_dependency_if_pk_equal(
-                            decomposed_relation,
-                            decomposed_relation.primary_key,
-                            fd.get_x(),
-                            fd.get_y(),
-                        )
-                    decomposed_relation.data = stored_data[:]
-                    final_5NF_relations.append(decomposed_relation)
-            else:
-                print_normalization_stage("No join dependencies found.")
-                final_5NF_relations.append(rel)
+        if anomalies:
+            print_normalization_stage(
+                f"Detected join dependencies: {', '.join(str(anomaly) for anomaly in anomalies)}"
+            )
+            list_of_5NF_relations = ensure_join_dependencies(rel, anomalies)
+            verify_decomposition(rel, list_of_5NF_relations, use_data=True)
+            for decomposed_relation in list_of_5NF_relations:
+                for fd in stored_fds:
+                    add_functional_dependency_if_pk_equal(
+                        decomposed_relation,
+                        decomposed_relation.primary_key,
+                        fd.get_x(),
+                        fd.get_y(),
+                    )
+                final_5NF_relations.append(decomposed_relation)
+        else:
+            print_normalization_stage("No join dependencies found.")
+            final_5NF_relations.append(rel)
 
     print_normalization_stage("Relations in 5NF")
     for count, final_relation in enumerate(final_5NF_relations, start=1):
@@ -489,176 +802,184 @@ def normalize_5NF(relation):
         final_relation.print_relation()
         print_data(final_relation)
 
+    increment_counter("relations_produced", len(final_5NF_relations))
     return final_5NF_relations
 
 
 # --------------------------------- Detect Anomaly Functions ---------------------------------
 
+# Largest determinant, and largest smaller side of a split, the 4NF detector and fix_mvds
+# search for MVDs; unbounded searches grow exponentially with the number of attributes
+MVD_MAX_LHS = 2
+MVD_MAX_RHS = 2
 
-# Detects anomalies in 1NF by checking for non-atomic attributes
+
+# Detects anomalies in 1NF by checking for non-atomic attributes; attributes the stored
+# tuples settle either way are decided without asking (see set_atomicity_checks)
+@traced
 def detect_1NF_anomalies(relation):
     anomalies = []
+    reports = {}
+    if atomicity_checks != "prompt":
+        reports = {
+            report["attribute"]: report
+            for report in find_non_atomic_attributes(relation)
+        }
+    atomic_below, non_atomic_above = atomicity_thresholds
+
     for attribute in relation.attributes:
-        is_atomic = input(f"Is '{attribute}' atomic? (yes/no): ").strip().lower()
+        report = reports.get(attribute)
+        if report is not None and report["confidence"] >= non_atomic_above:
+            get_output_sink().message(
+                "Attribute '{}' is non-atomic ({}, confidence {:.2f}), e.g. {}",
+                attribute,
+                report["kind"],
+                report["confidence"],
+                report["evidence"],
+            )
+            anomalies.append(attribute)
+            continue
+        if report is not None and (
+            report["confidence"] <= atomic_below or atomicity_checks == "data"
+        ):
+            continue
+
+        is_atomic = (
+            decide(
+                "atomic", f"Is '{attribute}' atomic? (yes/no): ", relation, attribute
+            )
+            .strip()
+            .lower()
+        )
         if is_atomic == "no":
             anomalies.append(attribute)
     return anomalies
 
 
 # Detects anomalies in 2NF by identifying partial dependencies
+@traced
 def detect_2NF_anomalies(relation):
     anomalies = []
+    increment_counter("fds_examined", len(relation.functional_dependencies))
+    closure = relation.closure_engine()
 
-    primary_key = set()
-    for pk in relation.primary_key:
-        if isinstance(pk, list):
-            primary_key.update(str(attr).strip() for attr in pk)
-        else:
-            primary_key.add(str(pk).strip())
-
-    all_keys = set()
-    for sublist in [relation.candidate_keys + relation.foreign_keys]:
-        for key in sublist:
-            if isinstance(key, list):
-                all_keys.update([",".join(map(str.strip, key))])
-            else:
-                all_keys.add(str(key).strip())
-
-    all_keys = all_keys.union({str(key).strip() for key in primary_key})
-
-    flat_attributes = (
-        {str(attr).strip() for sublist in relation.attributes for attr in sublist}
-        if any(isinstance(attr, list) for attr in relation.attributes)
-        else {str(attr).strip() for attr in relation.attributes}
+    key_sets = [closure.encode(key) for key in relation.primary_key_sets()]
+    key_attributes = closure.encode(
+        relation.primary_key + relation.candidate_keys + relation.foreign_keys
     )
-    non_keys = [attr for attr in flat_attributes if attr not in all_keys]
+    non_keys = closure.universe & ~key_attributes
 
+    found = 0
     for fd in relation.functional_dependencies:
-        X, Y = fd.get_x(), fd.get_y()
-        X_set = set(str(attr).strip() for attr in X)
+        X = closure.encode(fd.get_x())
 
-        if X_set.issubset(primary_key) and X_set != primary_key:
-            if all(y in non_keys for y in Y):
-                anomalies.extend(Y)
+        # A determinant that is a proper subset of a key makes everything in its closure partial
+        if any(X & ~key == 0 and X != key for key in key_sets):
+            dependents = closure.closure(X) & non_keys & ~found
+            found |= dependents
+            anomalies.extend(closure.decode(dependents))
 
     return anomalies
 
 
 # Detects anomalies in 3NF by identifying transitive dependencies
+@traced
 def detect_3NF_anomalies(relation):
     anomalies = []
-    primary_key_sets = []
-
-    for pk in relation.primary_key:
-        pk_str = pk if isinstance(pk, str) else ",".join(pk)
-        primary_key_sets.append(pk_str)
-
-    non_keys = [
-        attr
-        for attr in relation.attributes
-        if isinstance(attr, str)
-        and attr
-        not in {item for sublist in primary_key_sets for item in sublist.split(",")}
-    ]
+    increment_counter("fds_examined", len(relation.functional_dependencies))
+    closure = relation.closure_engine()
+
+    primary_key = flatten_attributes(relation.primary_key)
+    # Every key is enumerated: a partial list would leave prime attributes looking non-prime
+    candidate_keys = relation.find_candidate_keys()
+    prime_attributes = closure.encode(
+        primary_key + relation.candidate_keys + candidate_keys
+    )
+    primary_keys_str = "|".join(primary_key)
 
     for fd in relation.functional_dependencies:
-        X, Y = fd.get_x(), fd.get_y()
+        X = closure.encode(fd.get_x())
 
-        if not any(
-            set(primary_key.split(",")).issubset(set(X))
-            for primary_key in primary_key_sets
-        ):
-            for y in Y:
-                if y in non_keys:
-                    primary_keys_str = "|".join(
-                        ["|".join(pk.split(",")) for pk in primary_key_sets]
-                    )
-                    X_str = "|".join(X)
-                    Y_str = "|".join(Y)
-                    anomalies.append(f"{primary_keys_str}|{X_str}|{Y_str}")
+        if closure.is_superkey(X):
+            continue
+
+        # Non-prime attributes reached from a non-superkey, including through chains of FDs
+        dependents = closure.closure(X) & closure.universe & ~X & ~prime_attributes
+        if dependents:
+            X_str = "|".join(closure.decode(X))
+            Y_str = "|".join(closure.decode(dependents))
+            anomalies.append(f"{primary_keys_str}|{X_str}|{Y_str}")
 
     return anomalies
 
 
 # Detects BCNF anomalies by ensuring all determinants are superkeys
+@traced
 def detect_BCNF_anomalies(relation):
     anomalies = []
-    primary_key_sets = [
-        set(pk) if isinstance(pk, list) else {pk} for pk in relation.primary_key
-    ]
+    increment_counter("fds_examined", len(relation.functional_dependencies))
+    closure = relation.closure_engine()
 
     for fd in relation.functional_dependencies:
-        determinant_set = set(fd.get_x())
+        X, Y = fd.to_masks(closure)
 
-        if not any(determinant_set.issuperset(pk_set) for pk_set in primary_key_sets):
+        # Only non-trivial FDs whose determinant does not reach every attribute violate BCNF
+        if Y & ~X and not closure.is_superkey(X):
             anomalies.append(fd)
 
     return anomalies
 
 
 # Detects 4NF anomalies by identifying multi-valued dependencies (MVDs)
+@traced
 def detect_4NF_anomalies(relation):
     mvds = []
-
-    primary_key_attribute = str(relation.primary_key[0]).strip("[]'\" ,")
-
-    attribute_positions = list(relation.data[0].keys())
-    primary_key_position = None
-
-    for count, attr in enumerate(attribute_positions):
-        current_attr = str(attr).strip("[]'\" ,")
-
-        if primary_key_attribute == current_attr:
-            primary_key_position = current_attr
-            break
-
-    if primary_key_position is None:
-        return []
-
-    unique_keys = set()
-
-    for i, data in enumerate(relation.data):
-        primary_key_value = str(data[primary_key_position]).strip("[]'\" ,")
-
-        if primary_key_value in unique_keys:
-            print_divider()
-            print(
-                f"Multi-Valued Dependency detected in tuple {i} with primary key value = '{primary_key_value}'"
+    increment_counter("rows_scanned", relation.row_count())
+
+    primary_key = flatten_attributes(relation.primary_key)
+    data_attributes = relation.data_attributes()
+    if (
+        not relation.row_count()
+        or not primary_key
+        or not all(attr in data_attributes for attr in primary_key)
+    ):
+        return find_multivalued_dependencies(relation, MVD_MAX_LHS, MVD_MAX_RHS)
+
+    # Tuples repeating a primary key value come straight from the relation's key index
+    key_index = relation.key_index()
+    for i in key_index.duplicate_rows():
+        primary_key_value = ", ".join(map(str, relation.key_value(i, primary_key)))
+        print_divider()
+        get_output_sink().message(
+            "Multi-Valued Dependency detected in tuple {} with primary key value = '{}'",
+            i,
+            primary_key_value,
+        )
+        new_value = str(
+            decide(
+                "duplicate_key",
+                f"Enter a unique value for the primary key attribute '{primary_key[-1]}': ",
+                relation,
+                primary_key[-1],
+                relation.key_value(i, primary_key)[-1],
+                i,
             )
-            new_value = str(
-                input(
-                    f"Enter a unique value for the primary key attribute '{primary_key_position}': "
-                )
-            ).strip("[]'\" ,")
-            print_divider()
-            data[primary_key_position] = new_value
-        else:
-            unique_keys.add(primary_key_value)
+        ).strip()
+        print_divider()
+        relation.set_value(i, primary_key[-1], new_value)
+
+    sink = get_output_sink()
+    if sink.shows_messages:
+        for idx in range(1, relation.row_count() + 1):
+            sink.message("Tuple {}: {}", idx, relation.row(idx - 1))
 
-    for idx, data in enumerate(relation.data, start=1):
-        print(f"Tuple {idx}: {data}")
+    mvds.extend(find_multivalued_dependencies(relation, MVD_MAX_LHS, MVD_MAX_RHS))
 
     return mvds
 
 
 # Detects 5NF anomalies by identifying join dependencies in the relation
+@traced
 def detect_5NF_anomalies(relation):
-    join_dependencies = []
-    attributes = relation.attributes
-
-    for i in range(len(attributes)):
-        X = attributes[:i] + attributes[i + 1 :]
-        Y = [attributes[i]]
-
-        if check_join_dependency(relation, X, Y):
-            join_dependencies.append((X, Y))
-
-    return join_dependencies
-
-
-# Checks if a join dependency exists between attribute sets X and Y
-def check_join_dependency(relation, X, Y):
-    for data in relation.data:
-        if all(attr in data for attr in X + Y):
-            return True
-    return False
+    increment_counter("rows_scanned", relation.row_count())
+    return find_join_dependencies(relation)
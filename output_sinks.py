@@ -0,0 +1,214 @@
+import contextlib
+import json
+import sys
+from itertools import islice
+
+# --------------------------------- Table Views ---------------------------------
+
+
+# Class formatting a relation's tuples lazily: nothing is rendered until a page is requested
+class TableView:
+    def __init__(self, relation, page_size=1000, column_width=15):
+        self.relation = relation
+        self.attributes = relation.attributes[:]
+        self.page_size = page_size
+        self.column_width = column_width
+
+    def row_count(self):
+        return self.relation.row_count()
+
+    def header_lines(self):
+        # Returns the attribute header and the separator line under it
+        return [
+            " | ".join(self.attributes),
+            "-" * (len(self.attributes) * self.column_width),
+        ]
+
+    def rows(self, limit=None):
+        # Yields raw value tuples, at most `limit` of them
+        return islice(self.relation.iter_rows(self.attributes), limit)
+
+    def pages(self, limit=None):
+        # Yields lists of formatted lines, `page_size` rows at a time
+        rows = self.rows(limit)
+        while True:
+            page = list(islice(rows, self.page_size))
+            if not page:
+                return
+            yield [
+                " | ".join(str(value).ljust(self.column_width) for value in row)
+                for row in page
+            ]
+
+
+# --------------------------------- Output Sinks ---------------------------------
+
+
+# Class receiving everything normalization reports; the base class discards it all
+class OutputSink:
+    shows_messages = False  # False lets callers skip building per-row messages entirely
+
+    def stage(self, name):
+        # Receives a normalization stage banner or stage-level finding
+        pass
+
+    def divider(self):
+        # Receives a visual separator between report sections
+        pass
+
+    def message(self, template, *args):
+        # Receives a progress message; `template` is only formatted if the sink shows it
+        pass
+
+    def relation(self, relation):
+        # Receives a relation's schema (name, attributes, keys and FDs)
+        pass
+
+    def data(self, relation):
+        # Receives a relation's tuples
+        pass
+
+    def close(self):
+        # Flushes anything the sink buffered
+        pass
+
+
+# Class discarding all output, for unattended runs where nothing is read
+class QuietSink(OutputSink):
+    pass
+
+
+# Class printing the report to the console, rendering tables a page at a time;
+# `max_rows` truncates each printed table
+class ConsoleSink(OutputSink):
+    def __init__(self, stream=None, page_size=1000, max_rows=None):
+        self.stream = stream
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.shows_messages = True
+
+    def write(self, line=""):
+        print(line, file=self.stream or sys.stdout)
+
+    def stage(self, name):
+        self.divider()
+        self.write(name)
+        self.divider()
+
+    def divider(self):
+        self.write("\n-------------------------\n")
+
+    def message(self, template, *args):
+        self.write(template.format(*args) if args else template)
+
+    def relation(self, relation):
+        for line in relation.format_relation():
+            self.write(line)
+
+    def data(self, relation):
+        view = TableView(relation, self.page_size)
+        if not view.row_count():
+            self.write("No data available in relation.")
+            return
+
+        self.write("\nData:")
+        for line in view.header_lines():
+            self.write(line)
+        for page in view.pages(self.max_rows):
+            self.write("\n".join(page))
+        if self.max_rows is not None and view.row_count() > self.max_rows:
+            self.write(f"... {view.row_count() - self.max_rows} more rows")
+        self.write()
+
+
+# Class turning the report into structured events passed to `callback` as dicts; data
+# events carry a lazy TableView instead of rendered rows
+class EventSink(OutputSink):
+    def __init__(self, callback):
+        self.callback = callback
+        self.shows_messages = True
+
+    def stage(self, name):
+        self.callback({"type": "stage", "name": name})
+
+    def message(self, template, *args):
+        self.callback({"type": "message", "template": template, "args": list(args)})
+
+    def relation(self, relation):
+        self.callback({"type": "relation", "relation": relation.to_dict()})
+
+    def data(self, relation):
+        self.callback(
+            {
+                "type": "data",
+                "relation": str(relation.name),
+                "rows": relation.row_count(),
+                "view": TableView(relation),
+            }
+        )
+
+
+# Class collecting the report as JSON events and writing them on close(); messages are
+# skipped unless `include_messages`, and at most `max_rows` tuples per table are kept
+class JsonSink(EventSink):
+    def __init__(self, path=None, max_rows=0, include_messages=False):
+        super().__init__(self.collect)
+        self.path = path
+        self.max_rows = max_rows
+        self.shows_messages = include_messages
+        self.events = []
+
+    def collect(self, event):
+        if event["type"] == "message":
+            if not self.shows_messages:
+                return
+            event = {
+                "type": "message",
+                "text": event["template"].format(*event["args"]),
+            }
+        elif event["type"] == "data":
+            view = event.pop("view")
+            event["attributes"] = [str(attr) for attr in view.attributes]
+            event["sample"] = [
+                [str(value) for value in row] for row in view.rows(self.max_rows)
+            ]
+        self.events.append(event)
+
+    def close(self):
+        output = json.dumps({"events": self.events}, indent=2)
+        if self.path:
+            with open(self.path, "w", encoding="utf-8") as file:
+                file.write(output + "\n")
+        else:
+            print(output)
+
+
+# --------------------------------- Sink Selection ---------------------------------
+
+# Sink receiving normalization output; the console by default
+output_sink = ConsoleSink()
+
+
+# Returns the sink currently receiving normalization output
+def get_output_sink():
+    return output_sink
+
+
+# Replaces the sink receiving normalization output and returns the previous one
+def set_output_sink(sink):
+    global output_sink
+    previous = output_sink
+    output_sink = sink
+    return previous
+
+
+# Sends normalization output to a sink for the duration of the block, then closes it and
+# restores the previous sink
+@contextlib.contextmanager
+def use_output_sink(sink):
+    previous = set_output_sink(sink)
+    try:
+        yield sink
+    finally:
+        set_output_sink(previous)
+        sink.close()
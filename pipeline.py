@@ -0,0 +1,49 @@
+from normalize_functions import *
+
+# Normal forms in the order the pipeline reaches them
+STAGES = ["1NF", "2NF", "3NF", "BCNF", "4NF", "5NF"]
+
+# Stage bodies, each taking the previous stage's output
+STAGE_FUNCTIONS = {
+    "1NF": apply_1NF_stage,
+    "2NF": apply_2NF_stage,
+    "3NF": apply_3NF_stage,
+    "BCNF": apply_BCNF_stage,
+    "4NF": apply_4NF_stage,
+    "5NF": apply_5NF_stage,
+}
+
+
+# Class running 1NF -> 5NF on one relation at most once per stage, memoizing each
+# stage's output so several target forms can be requested without recomputation
+class NormalizationPipeline:
+    def __init__(self, relation):
+        # Works on a copy so the caller's relation is left untouched
+        self.relation = relation.copy()
+        self.results = {}  # Maps stage name -> list of relations in that normal form
+
+    def run(self, stage):
+        # Returns the relations in the given normal form, computing missing stages only
+        stage = str(stage).upper()
+        if stage not in STAGE_FUNCTIONS:
+            raise ValueError(f"Unknown normalization stage: '{stage}'.")
+
+        if stage not in self.results:
+            index = STAGES.index(stage)
+            if index == 0:
+                stage_input = self.relation.copy()
+            else:
+                # Stages rename and modify their input, so they work on copies of the cache
+                stage_input = [rel.copy() for rel in self.run(STAGES[index - 1])]
+
+            print_normalization_stage(f"{stage} Normalization Started")
+            self.results[stage] = STAGE_FUNCTIONS[stage](stage_input)
+
+        return self.results[stage]
+
+    def run_all(self, stages=None):
+        # Returns a dict of stage name -> relations for the requested stages (default: all)
+        return {stage: self.run(stage) for stage in (stages or STAGES)}
+
+    def __getitem__(self, stage):
+        return self.run(stage)
@@ -0,0 +1,16 @@
+from classes import *
+
+
+# Builds a relation from attribute names, FDs as (X, Y) pairs, an optional primary key and
+# optional tuples given as value lists in attribute order
+def make_relation(
+    attributes, fds=(), primary_key=None, rows=(), columnar=False, name="r"
+):
+    relation = Relation(name, list(attributes), columnar=columnar)
+    if primary_key:
+        relation.add_primary_key(list(primary_key))
+    for X, Y in fds:
+        relation.add_functional_dependency(list(X), list(Y))
+    if rows:
+        relation.add_tuples([list(row) for row in rows], attributes=list(attributes))
+    return relation
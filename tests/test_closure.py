@@ -0,0 +1,104 @@
+from helpers import make_relation
+
+from classes import *
+
+# ---- Attribute closure ----
+
+
+# A -> B, B -> C: the closure of A follows the chain, the closure of C is C alone
+def test_closure_follows_chains():
+    closure = AttributeClosure(["A", "B", "C", "D"], [(["A"], ["B"]), (["B"], ["C"])])
+    assert closure.decode(closure.closure(closure.encode(["A"]))) == ["A", "B", "C"]
+    assert closure.decode(closure.closure(closure.encode(["C"]))) == ["C"]
+    assert closure.is_superkey(closure.encode(["A", "D"]))
+    assert not closure.is_superkey(closure.encode(["A"]))
+
+
+# An FD with a composite left-hand side only fires once every attribute is reached
+def test_closure_needs_whole_left_hand_side():
+    closure = AttributeClosure(["A", "B", "C"], [(["A", "B"], ["C"])])
+    assert closure.decode(closure.closure(closure.encode(["A"]))) == ["A"]
+    assert closure.decode(closure.closure(closure.encode(["A", "B"]))) == [
+        "A",
+        "B",
+        "C",
+    ]
+
+
+# ---- Covers ----
+
+
+# A -> BC, B -> C, AB -> C reduces to A -> B, B -> C: A -> C and AB -> C are redundant
+def test_minimal_cover_drops_redundant_dependencies():
+    relation = make_relation(
+        ["A", "B", "C"], [(["A"], ["B", "C"]), (["B"], ["C"]), (["A", "B"], ["C"])]
+    )
+    cover = {(tuple(fd.get_x()), tuple(fd.get_y())) for fd in relation.minimal_cover()}
+    assert cover == {(("A",), ("B",)), (("B",), ("C",))}
+
+
+# A -> B and A -> C merge into A -> BC in the canonical cover
+def test_canonical_cover_merges_right_hand_sides():
+    relation = make_relation(["A", "B", "C"], [(["A"], ["B"]), (["A"], ["C"])])
+    cover = relation.canonical_cover()
+    assert len(cover) == 1
+    assert cover[0].get_x() == ["A"]
+    assert sorted(cover[0].get_y()) == ["B", "C"]
+
+
+# FDs compare by their attribute sets, so reordered duplicates are skipped
+def test_duplicate_dependencies_are_skipped():
+    relation = make_relation(
+        ["A", "B", "C"], [(["A", "B"], ["C"]), (["B", "A"], ["C"])]
+    )
+    assert len(relation.functional_dependencies) == 1
+
+
+# ---- Candidate keys ----
+
+
+# AB -> C, C -> B has the two keys AB and AC
+def test_candidate_keys_of_overlapping_dependencies():
+    relation = make_relation(["A", "B", "C"], [(["A", "B"], ["C"]), (["C"], ["B"])])
+    keys = {frozenset(key) for key in relation.find_candidate_keys()}
+    assert keys == {frozenset("AB"), frozenset("AC")}
+
+
+# A -> B, B -> C, C -> A makes every single attribute a key; D appears in no FD and is in
+# every key
+def test_candidate_keys_of_a_cycle():
+    relation = make_relation(
+        ["A", "B", "C", "D"], [(["A"], ["B"]), (["B"], ["C"]), (["C"], ["A"])]
+    )
+    keys = {frozenset(key) for key in relation.find_candidate_keys()}
+    assert keys == {frozenset("AD"), frozenset("BD"), frozenset("CD")}
+
+
+# Without FDs the only key is the whole schema
+def test_candidate_key_without_dependencies():
+    relation = make_relation(["A", "B"])
+    assert [sorted(key) for key in relation.find_candidate_keys()] == [["A", "B"]]
+
+
+# Ai <-> Bi for i < 8 has 2^8 keys; `limit` stops the enumeration early
+def test_candidate_key_limit():
+    attributes = [f"{side}{i}" for i in range(8) for side in "AB"]
+    fds = [([f"A{i}"], [f"B{i}"]) for i in range(8)] + [
+        ([f"B{i}"], [f"A{i}"]) for i in range(8)
+    ]
+    relation = make_relation(attributes, fds)
+    assert len(relation.find_candidate_keys()) == 256
+    assert len(relation.find_candidate_keys(limit=5)) == 5
+
+
+# ---- BCNF decomposition ----
+
+
+# R(A, B, C) with A -> B splits into AB and AC, both in BCNF
+def test_bcnf_decomposition_splits_on_violation():
+    relation = make_relation(["A", "B", "C"], [(["A"], ["B"])])
+    closure = relation.closure_engine()
+    schemas = {
+        frozenset(closure.decode(schema)) for schema in closure.bcnf_decomposition()
+    }
+    assert schemas == {frozenset("AB"), frozenset("AC")}
@@ -0,0 +1,168 @@
+import pytest
+from helpers import make_relation
+
+from discovery_functions import *
+
+
+# Lists discovered FDs as (sorted determinant, dependent) pairs
+def discovered(relation, max_lhs=None):
+    return {
+        (tuple(sorted(fd.get_x())), fd.get_y()[0])
+        for fd in discover_functional_dependencies(relation, max_lhs)
+    }
+
+
+# ---- TANE functional dependency discovery ----
+
+
+# emp is a key, dept and head determine each other, and salary only repeats across depts
+EMPLOYEES = [
+    ["e1", "sales", "ann", "10"],
+    ["e2", "sales", "ann", "20"],
+    ["e3", "it", "bob", "10"],
+    ["e4", "it", "bob", "30"],
+    ["e5", "hr", "cid", "20"],
+]
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_tane_finds_minimal_dependencies(columnar):
+    relation = make_relation(
+        ["emp", "dept", "head", "salary"], rows=EMPLOYEES, columnar=columnar
+    )
+    assert discovered(relation) == {
+        (("emp",), "dept"),
+        (("emp",), "head"),
+        (("emp",), "salary"),
+        (("dept",), "head"),
+        (("head",), "dept"),
+        (("dept", "salary"), "emp"),
+        (("head", "salary"), "emp"),
+    }
+
+
+# C holds A + B mod 2 over all four (A, B) combinations: only AB determines C, AC
+# determines B and BC determines A
+def test_tane_finds_composite_determinants():
+    rows = [[a, b, (a + b) % 2] for a in range(2) for b in range(2)]
+    relation = make_relation(["A", "B", "C"], rows=rows)
+    assert discovered(relation) == {
+        (("A", "B"), "C"),
+        (("A", "C"), "B"),
+        (("B", "C"), "A"),
+    }
+    assert discovered(relation, max_lhs=1) == set()
+
+
+# A constant column is determined by the empty set, and nothing else is reported for it
+def test_tane_reports_constant_columns():
+    relation = make_relation(["A", "B"], rows=[["1", "x"], ["2", "x"], ["3", "x"]])
+    assert discovered(relation) == {((), "B")}
+
+
+# Every discovered FD holds in the data and no smaller determinant works
+def test_tane_dependencies_hold_and_are_minimal():
+    rows = [[i % 3, i % 4, (i % 3) * 10 + i % 2, i % 2] for i in range(24)]
+    relation = make_relation(["A", "B", "C", "D"], rows=rows)
+    columns = {attr: relation.column(attr) for attr in relation.attributes}
+
+    def holds(X, Y):
+        seen = {}
+        for index in range(relation.row_count()):
+            key = tuple(columns[attr][index] for attr in X)
+            if seen.setdefault(key, columns[Y][index]) != columns[Y][index]:
+                return False
+        return True
+
+    fds = discovered(relation)
+    assert fds
+    for X, Y in fds:
+        assert holds(X, Y)
+        for attr in X:
+            assert not holds([other for other in X if other != attr], Y)
+
+
+# apply=True stores the discovered FDs on the relation
+def test_tane_apply_adds_dependencies():
+    relation = make_relation(["emp", "dept", "head", "salary"], rows=EMPLOYEES)
+    discover_functional_dependencies(relation, apply=True)
+    assert any(
+        fd.get_x() == ["dept"] and fd.get_y() == ["head"]
+        for fd in relation.functional_dependencies
+    )
+
+
+# ---- Multivalued dependencies ----
+
+
+# course ->> teacher | book: every teacher of a course uses every book of the course
+COURSES = [
+    [course, teacher, book]
+    for course, teachers, books in [
+        ("db", ["ann", "bob"], ["date", "ullman"]),
+        ("os", ["cid"], ["tanenbaum", "silberschatz"]),
+    ]
+    for teacher in teachers
+    for book in books
+]
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_mvd_is_found(columnar):
+    relation = make_relation(
+        ["course", "teacher", "book"], rows=COURSES, columnar=columnar
+    )
+    mvds = find_multivalued_dependencies(relation)
+    assert (["course"], ["teacher"]) in mvds or (["course"], ["book"]) in mvds
+    assert check_multivalued_dependency(relation, ["course"], ["teacher"])
+
+
+# Dropping one (teacher, book) combination breaks the MVD on course
+def test_mvd_needs_every_combination():
+    relation = make_relation(["course", "teacher", "book"], rows=COURSES[1:])
+    assert not check_multivalued_dependency(relation, ["course"], ["teacher"])
+    assert all(X != ["course"] for X, _ in find_multivalued_dependencies(relation))
+
+
+# A determinant that is a superkey gives no MVD violation
+def test_mvd_skips_superkeys():
+    rows = [[str(i), str(i % 2), str(i % 3)] for i in range(6)]
+    relation = make_relation(["id", "A", "B"], primary_key=["id"], rows=rows)
+    assert all(X != ["id"] for X, _ in find_multivalued_dependencies(relation))
+
+
+# ---- Join dependencies ----
+
+
+# The classic supplier/part/project relation satisfying *(SP, PJ, JS) but not any binary split
+SPJ = [
+    ["s1", "p1", "j2"],
+    ["s1", "p2", "j1"],
+    ["s2", "p1", "j1"],
+    ["s1", "p1", "j1"],
+]
+
+
+def test_join_dependency_of_three_components():
+    relation = make_relation(["S", "P", "J"], rows=SPJ)
+    assert check_join_dependency(relation, [["S", "P"], ["P", "J"], ["J", "S"]])
+    assert not check_join_dependency(relation, [["S", "P"], ["P", "J"]])
+    components = find_join_dependencies(relation)
+    assert components and sorted(map(sorted, components[0])) == [
+        ["J", "P"],
+        ["J", "S"],
+        ["P", "S"],
+    ]
+
+
+# Removing (s1, p1, j1) breaks the join dependency: the join would recreate it
+def test_join_dependency_detects_spurious_tuples():
+    relation = make_relation(["S", "P", "J"], rows=SPJ[:3])
+    assert not check_join_dependency(relation, [["S", "P"], ["P", "J"], ["J", "S"]])
+    assert find_join_dependencies(relation) == []
+
+
+# Components not covering the attributes never form a join dependency
+def test_join_dependency_needs_every_attribute():
+    relation = make_relation(["S", "P", "J"], rows=SPJ)
+    assert not check_join_dependency(relation, [["S", "P"], ["P"]])
@@ -0,0 +1,85 @@
+import pytest
+from helpers import make_relation
+
+from classes import *
+
+ROWS = [["1", "a", "x"], ["2", "a", "y"], ["3", "b", "x"], ["4", "a", "x"]]
+
+
+# ---- Row and columnar storage ----
+
+
+# Both layouts return the same tuples, columns and codes
+def test_layouts_agree():
+    rows = make_relation(["id", "g", "v"], rows=ROWS)
+    columns = make_relation(["id", "g", "v"], rows=ROWS, columnar=True)
+    assert list(rows.iter_rows()) == list(columns.iter_rows())
+    assert rows.column("g") == columns.column("g") == ["a", "a", "b", "a"]
+    assert rows.column_codes("g")[:] == [0, 0, 1, 0]
+    assert list(columns.column_codes("g")) == [0, 0, 1, 0]
+    assert sorted(columns.value_counts("g")) == [("a", 3), ("b", 1)]
+
+
+# ---- Copy-on-write ----
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_copies_share_data_until_written(columnar):
+    relation = make_relation(["id", "g", "v"], rows=ROWS, columnar=columnar)
+    copy = relation.copy()
+    copy.set_value(0, "g", "z")
+    copy.add_tuple({"id": "5", "g": "c", "v": "y"})
+    assert relation.column("g") == ["a", "a", "b", "a"]
+    assert copy.column("g") == ["z", "a", "b", "a", "c"]
+
+
+# Relation.data is a read-only snapshot
+@pytest.mark.parametrize("columnar", [False, True])
+def test_data_is_read_only(columnar):
+    relation = make_relation(["id", "g", "v"], rows=ROWS, columnar=columnar)
+    data = relation.data
+    with pytest.raises(AttributeError):
+        data.append({})
+    with pytest.raises(TypeError):
+        data[0]["g"] = "z"
+    assert relation.column("g") == ["a", "a", "b", "a"]
+
+
+# ---- Projection ----
+
+
+# Projections keep one tuple per distinct combination, in first-seen order, with either method
+@pytest.mark.parametrize("columnar", [False, True])
+@pytest.mark.parametrize("method", ["hash", "sort"])
+def test_projection_deduplicates(columnar, method):
+    relation = make_relation(["id", "g", "v"], rows=ROWS, columnar=columnar)
+    projected = relation.project(["g", "v"], method=method)
+    assert list(projected.iter_rows()) == [("a", "x"), ("a", "y"), ("b", "x")]
+    assert list(projected.attributes) == ["g", "v"]
+
+
+# A key outside a relation's attributes is not projected
+def test_projection_ignores_keys_outside_the_attributes():
+    relation = make_relation(["id", "g", "v"], rows=ROWS)
+    piece = Relation("piece", ["g"])
+    piece.add_primary_key(["id"])
+    piece.load_projection(relation)
+    assert piece.row_count() == 2
+    assert piece.data_attributes() == ["g"]
+
+
+# ---- FD checks on insert ----
+
+
+def test_fd_checks_reject_and_report():
+    relation = make_relation(["id", "g", "v"], [(["g"], ["v"])])
+    relation.check_functional_dependencies("reject")
+    relation.add_tuple({"id": "1", "g": "a", "v": "x"})
+    with pytest.raises(ValueError):
+        relation.add_tuple({"id": "2", "g": "a", "v": "y"})
+    assert relation.row_count() == 1
+
+    relation.check_functional_dependencies("report")
+    relation.add_tuple({"id": "2", "g": "a", "v": "y"})
+    assert relation.row_count() == 2
+    assert len(relation.fd_violations) == 1
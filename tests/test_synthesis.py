@@ -0,0 +1,91 @@
+from helpers import make_relation
+
+from normalize_functions import *
+
+
+# Lists the attribute sets of relations
+def schemas(relations):
+    return {
+        frozenset(flatten_attributes(relation.attributes)) for relation in relations
+    }
+
+
+# Synthesizes quietly
+def synthesize(relation):
+    with use_output_sink(QuietSink()):
+        return synthesize_3NF_relations(relation)
+
+
+# ---- Bernstein 3NF synthesis ----
+
+
+# A -> B, B -> C gives AB and BC; AB holds the key A, so no key relation is added
+def test_synthesis_groups_by_determinant():
+    relation = make_relation(["A", "B", "C"], [(["A"], ["B"]), (["B"], ["C"])])
+    relations = synthesize(relation)
+    assert schemas(relations) == {frozenset("AB"), frozenset("BC")}
+    assert check_lossless_join(relation, relations)
+    assert check_dependency_preservation(relation, relations)
+
+
+# A -> B and C -> D leave the key AC in no relation, so a key relation is added
+def test_synthesis_adds_a_key_relation():
+    relation = make_relation(["A", "B", "C", "D"], [(["A"], ["B"]), (["C"], ["D"])])
+    relations = synthesize(relation)
+    assert schemas(relations) == {frozenset("AB"), frozenset("CD"), frozenset("AC")}
+    assert check_lossless_join(relation, relations)
+
+
+# A -> B, A -> C share a determinant and end up in one relation keyed on A
+def test_synthesis_merges_shared_determinants():
+    relation = make_relation(["A", "B", "C"], [(["A"], ["B"]), (["A"], ["C"])])
+    relations = synthesize(relation)
+    assert schemas(relations) == {frozenset("ABC")}
+    assert flatten_attributes(relations[0].primary_key) == ["A"]
+
+
+# Redundant FDs do not produce extra relations: A -> C follows from A -> B, B -> C
+def test_synthesis_uses_the_minimal_cover():
+    relation = make_relation(
+        ["A", "B", "C"], [(["A"], ["B"]), (["B"], ["C"]), (["A"], ["C"])]
+    )
+    assert schemas(synthesize(relation)) == {frozenset("AB"), frozenset("BC")}
+
+
+# The synthesized relations hold the distinct projections of the parent's tuples
+def test_synthesis_projects_the_data():
+    rows = [["1", "x", "p"], ["2", "x", "p"], ["3", "y", "q"]]
+    relation = make_relation(
+        ["A", "B", "C"], [(["A"], ["B"]), (["B"], ["C"])], rows=rows
+    )
+    relations = {frozenset(rel.attributes): rel for rel in synthesize(relation)}
+    assert relations[frozenset("AB")].row_count() == 3
+    assert sorted(relations[frozenset("BC")].iter_rows(["B", "C"])) == [
+        ("x", "p"),
+        ("y", "q"),
+    ]
+
+
+# ---- 3NF decomposition ----
+
+
+# id -> dept, dept -> head splits into (dept, head) keyed on dept and (id, dept) keyed on id
+def test_transitive_dependency_split():
+    relation = make_relation(
+        ["id", "dept", "head"],
+        [(["id"], ["dept"]), (["dept"], ["head"])],
+        primary_key=["id"],
+    )
+    with use_output_sink(QuietSink()):
+        relations = fix_transitive_functional_dependencies(
+            relation, detect_3NF_anomalies(relation)
+        )
+    by_schema = {tuple(rel.attributes): rel for rel in relations}
+    assert set(by_schema) == {("dept", "head"), ("id", "dept")}
+    assert flatten_attributes(by_schema[("dept", "head")].primary_key) == ["dept"]
+    assert [
+        (fd.get_x(), fd.get_y())
+        for fd in by_schema[("dept", "head")].functional_dependencies
+    ] == [(["dept"], ["head"])]
+    assert check_lossless_join(relation, relations)
+    assert check_dependency_preservation(relation, relations)
@@ -0,0 +1,77 @@
+from helpers import make_relation
+
+from verification_functions import *
+
+
+# Builds a decomposed relation holding only its attribute list
+def part(attributes):
+    return make_relation(attributes, name="_".join(attributes))
+
+
+# ---- Lossless join (chase) ----
+
+
+# R(A, B, C) with A -> B: AB and AC share A, which determines AB, so the join is lossless
+def test_split_on_a_determinant_is_lossless():
+    relation = make_relation(["A", "B", "C"], [(["A"], ["B"])])
+    assert check_lossless_join(relation, [part(["A", "B"]), part(["A", "C"])])
+
+
+# Without FDs, AB and BC lose information; with B -> C they do not
+def test_split_without_shared_key_is_lossy():
+    relation = make_relation(["A", "B", "C"])
+    assert not check_lossless_join(relation, [part(["A", "B"]), part(["B", "C"])])
+    relation.add_functional_dependency(["B"], ["C"])
+    assert check_lossless_join(relation, [part(["A", "B"]), part(["B", "C"])])
+
+
+# The chase needs several rounds: with A -> B and B -> C, the components AD, AB and BC
+# only join losslessly after equating B from the first FD and then C from the second
+def test_chase_applies_dependencies_repeatedly():
+    relation = make_relation(["A", "B", "C", "D"], [(["A"], ["B"]), (["B"], ["C"])])
+    parts = [part(["A", "D"]), part(["A", "B"]), part(["B", "C"])]
+    assert check_lossless_join(relation, parts)
+    assert not check_lossless_join(relation, [part(["A", "D"]), part(["B", "C"])])
+
+
+# A primary key missing from a relation's attributes holds no data: (b, c, d) keyed on a
+# does not cover a
+def test_components_ignore_key_attributes_outside_the_relation():
+    relation = make_relation(
+        ["a", "b", "c", "d"], [(["b"], ["c"]), (["c"], ["d"])], primary_key=["a"]
+    )
+    piece = part(["b", "c", "d"])
+    piece.add_primary_key(["a"])
+    assert not check_lossless_join(relation, [piece])
+
+
+# A lossy split by the FDs is accepted with use_data when the tuples join back exactly
+def test_lossless_join_from_data():
+    rows = [["a1", "b1", "c1"], ["a2", "b2", "c1"]]
+    relation = make_relation(["A", "B", "C"], rows=rows)
+    parts = [part(["A", "C"]), part(["B", "C"])]
+    assert not check_lossless_join(relation, parts)
+    assert not check_lossless_join(relation, parts, use_data=True)
+    relation = make_relation(["A", "B", "C"], rows=rows[:1])
+    assert check_lossless_join(relation, parts, use_data=True)
+
+
+# ---- Dependency preservation ----
+
+
+# R(A, B, C) with AB -> C and C -> B: the BCNF split into CB and CA loses AB -> C
+def test_bcnf_split_loses_a_dependency():
+    relation = make_relation(["A", "B", "C"], [(["A", "B"], ["C"]), (["C"], ["B"])])
+    lost = find_lost_dependencies(relation, [part(["C", "B"]), part(["C", "A"])])
+    assert [(fd.get_x(), fd.get_y()) for fd in lost] == [(["A", "B"], ["C"])]
+
+
+# A -> C is preserved through A -> B in AB and B -> C in BC, although no piece holds AC
+def test_dependency_preserved_across_relations():
+    relation = make_relation(
+        ["A", "B", "C"], [(["A"], ["B"]), (["B"], ["C"]), (["A"], ["C"])]
+    )
+    assert check_dependency_preservation(relation, [part(["A", "B"]), part(["B", "C"])])
+    assert not check_dependency_preservation(
+        relation, [part(["A", "B"]), part(["A", "C"])]
+    )
@@ -0,0 +1,151 @@
+from classes import *
+from discovery_functions import *
+
+# --------------------------------- Helper Functions ---------------------------------
+
+
+# Returns the attributes a decomposed relation covers: its attributes, and nothing else
+def relation_component(relation):
+    return flatten_attributes(relation.attributes)
+
+
+# Finds the representative symbol of a tableau cell, halving the path on the way
+def find_symbol(parents, symbol):
+    while parents[symbol] != symbol:
+        parents[symbol] = parents[parents[symbol]]
+        symbol = parents[symbol]
+    return symbol
+
+
+# Equates two tableau symbols; the smaller symbol represents the merged class, so a
+# distinguished symbol always wins. Returns True if the classes were distinct
+def union_symbols(parents, first, second):
+    first = find_symbol(parents, first)
+    second = find_symbol(parents, second)
+    if first == second:
+        return False
+    if first < second:
+        parents[second] = first
+    else:
+        parents[first] = second
+    return True
+
+
+# --------------------------------- Lossless-Join Functions ---------------------------------
+
+
+# Chases a tableau with one row per component (bitmask over `width` attributes) under FDs
+# given as (lhs mask, rhs mask) pairs. Cells are integers: column j's distinguished symbol
+# is j, every other cell starts as its own symbol, and equated symbols share a union-find
+# class. Returns True once some row holds only distinguished symbols in the `target` columns
+# (default: all), meaning the join is lossless
+def chase_tableau(width, components, dependencies, target=None):
+    columns = list(iterate_bits((1 << width) - 1 if target is None else target))
+    parents = list(range(width))
+    rows = []
+    for component in components:
+        row = []
+        for position in range(width):
+            if component >> position & 1:
+                row.append(position)
+            else:
+                row.append(len(parents))
+                parents.append(len(parents))
+        rows.append(row)
+
+    dependencies = [
+        (list(iterate_bits(lhs)), list(iterate_bits(rhs & ~lhs)))
+        for lhs, rhs in dependencies
+        if rhs & ~lhs
+    ]
+
+    changed = True
+    while changed:
+        if any(
+            all(find_symbol(parents, row[position]) == position for position in columns)
+            for row in rows
+        ):
+            return True
+
+        changed = False
+        for lhs, rhs in dependencies:
+            # Rows agreeing on the left-hand side must agree on the right-hand side
+            first_rows = {}
+            for row in rows:
+                key = tuple(find_symbol(parents, row[position]) for position in lhs)
+                first = first_rows.setdefault(key, row)
+                if first is not row:
+                    for position in rhs:
+                        if union_symbols(parents, first[position], row[position]):
+                            changed = True
+
+    return False
+
+
+# Checks that joining the decomposed relations reproduces the parent relation exactly,
+# under the parent's FDs (including its primary key). With `use_data`, a decomposition the
+# FDs cannot justify (4NF/5NF splits rest on MVDs and JDs) is also accepted when joining the
+# projections of the parent's tuples gives back exactly those tuples
+def check_lossless_join(parent_relation, decomposed_relations, use_data=False):
+    closure = parent_relation.closure_engine()
+    components = [
+        closure.encode(relation_component(relation)) & closure.universe
+        for relation in decomposed_relations
+    ]
+    if not components:
+        return not closure.universe
+    if any(component == closure.universe for component in components):
+        return True
+    if chase_tableau(
+        len(closure.names),
+        components,
+        zip(closure.lhs_masks, closure.rhs_masks),
+        closure.universe,
+    ):
+        return True
+    return bool(
+        use_data
+        and parent_relation.row_count()
+        and check_join_dependency(
+            parent_relation, [closure.decode(component) for component in components]
+        )
+    )
+
+
+# --------------------------------- Dependency-Preservation Functions ---------------------------------
+
+
+# Returns the parent's FDs that cannot be enforced on the decomposed relations alone. Uses
+# the restricted-closure test: grow Z from X by adding ((Z ∩ Ri)+ ∩ Ri) for each relation
+# Ri until Z stops changing; X -> Y is preserved iff Y ⊆ Z. Projected FD sets are never
+# built, so the check is polynomial in the number of FDs, attributes and relations
+def find_lost_dependencies(parent_relation, decomposed_relations):
+    closure = parent_relation.closure_engine()
+    components = [
+        closure.encode(relation_component(relation))
+        for relation in decomposed_relations
+    ]
+
+    lost = []
+    for fd in parent_relation.functional_dependencies:
+        lhs, rhs = fd.to_masks(closure)
+        reached = lhs
+        changed = True
+        while changed and rhs & ~reached:
+            changed = False
+            for component in components:
+                inside = reached & component
+                if not inside:
+                    continue
+                new_bits = closure.closure(inside) & component & ~reached
+                if new_bits:
+                    reached |= new_bits
+                    changed = True
+        if rhs & ~reached:
+            lost.append(fd)
+    return lost
+
+
+# Checks whether every FD of the parent can still be enforced on the decomposed relations
+def check_dependency_preservation(parent_relation, decomposed_relations):
+    return not find_lost_dependencies(parent_relation, decomposed_relations)